@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+from utils import render
+
+# Usage: python benchmarks/bench_fit_text.py [path/to/font.ttf]
+if len(sys.argv) > 1:
+    render.FONT_PATH = sys.argv[1]
+
+WORDS = "the quick brown fox jumps over the lazy dog while grass guy watches".split()
+
+def legacy_fit_text(text):
+    # The original linear search: reload the font and re-measure the growing line each step
+    def get_text_size(draw, text, font):
+        bbox = draw.textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+    def wrap_text(draw, text, font, max_width):
+        lines = []
+        current_line = ""
+        for word in text.split():
+            test_line = current_line + word + " "
+            if get_text_size(draw, test_line, font)[0] <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line.strip())
+                current_line = word + " "
+        if current_line:
+            lines.append(current_line.strip())
+        return lines
+
+    font_size = render.INITIAL_FONT_SIZE
+    while font_size > 1:
+        font = ImageFont.truetype(render.FONT_PATH, font_size)
+        draw = ImageDraw.Draw(Image.new('RGB', (render.WIDTH, render.HEIGHT)))
+        wrapped_text = wrap_text(draw, text, font, render.WIDTH - render.MARGIN)
+        if sum(get_text_size(draw, line, font)[1] for line in wrapped_text) <= render.HEIGHT - render.MARGIN:
+            break
+        font_size -= 1
+
+def timeit(func, text, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+if __name__ == "__main__":
+    print(f"{'words':>6} {'legacy ms':>10} {'binary ms':>10} {'speedup':>8}")
+    for word_count in (5, 20, 50, 100, 200, 400):
+        text = " ".join(WORDS[i % len(WORDS)] for i in range(word_count))
+        legacy = timeit(legacy_fit_text, text)
+        render.load_font.cache_clear()
+        current = timeit(render.fit_text, text)
+        print(f"{word_count:>6} {legacy:>10.2f} {current:>10.2f} {legacy / current:>7.1f}x")
@@ -0,0 +1,53 @@
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.links import might_contain_twitter_link, rewrite_twitter_links
+
+LEGACY_REGEX = re.compile(r'https:\/\/(?:twitter|x)\.com\/[a-zA-Z0-9]+\/status\/[a-zA-Z0-9]+')
+
+def legacy(content):
+    links = LEGACY_REGEX.findall(content)
+    return [link.replace('twitter.com', 'fxtwitter.com').replace('x.com', 'fxtwitter.com') for link in links]
+
+def current(content):
+    if not might_contain_twitter_link(content):
+        return []
+    return rewrite_twitter_links(content)
+
+def build_corpus(size=20000, link_ratio=0.01, seed=1):
+    rng = random.Random(seed)
+    chatter = [
+        "lol", "gg", "anyone up for ranked tonight?", "brb",
+        "check the pins for the schedule", "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "that patch broke everything " * 3, "https://example.com/status/page",
+        "I sent it to max.com support already", "ok " * 40
+    ]
+    links = [
+        "https://twitter.com/grassguy/status/1789012345678901234",
+        "look at this https://x.com/some_user/status/1790000000000000000 lmao",
+        "https://x.com/a/status/1 and https://twitter.com/b/status/2"
+    ]
+    return [rng.choice(links) if rng.random() < link_ratio else rng.choice(chatter) for _ in range(size)]
+
+def bench(func, corpus, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in corpus:
+            func(content)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus) * 1e9
+
+if __name__ == "__main__":
+    corpus = build_corpus()
+    non_matching = [content for content in corpus if not LEGACY_REGEX.search(content)]
+    matching = [content for content in corpus if LEGACY_REGEX.search(content)]
+
+    print(f"{'corpus':<14} {'legacy ns/msg':>14} {'current ns/msg':>15}")
+    for name, messages in (("mixed", corpus), ("non-matching", non_matching), ("matching", matching)):
+        print(f"{name:<14} {bench(legacy, messages):>14.0f} {bench(current, messages):>15.0f}")
@@ -0,0 +1,41 @@
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cipher import CIPHER_MAP, REVERSE_CIPHER_MAP, to_plain_text, to_machine_cipher, iter_machine_cipher
+
+def legacy_to_plain_text(cipher_message):
+    emote_pattern = r'<a?:MachineCipher([A-Z]):\d+>'
+    translated_message = re.sub(emote_pattern, lambda m: REVERSE_CIPHER_MAP[f":MachineCipher{m.group(1)}:"], cipher_message)
+    return re.sub(r'\s+', ' ', translated_message.strip())
+
+def legacy_to_machine_cipher(plain_text):
+    return ''.join([CIPHER_MAP[char.lower()] if char.lower() in CIPHER_MAP else ' ' for char in plain_text])
+
+def bench(func, text, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+if __name__ == "__main__":
+    sentence = "The Machine speaks in ciphers, and only the grass guy can read them. "
+    print(f"{'chars':>7} {'op':<8} {'legacy us':>10} {'current us':>11}")
+    for repeat in (1, 10, 100, 1000):
+        plain = sentence * repeat
+        cipher = " ".join(
+            f"<:MachineCipher{char.upper()}:{1000 + ord(char)}>" if char.isalpha() else "  "
+            for char in plain.lower()
+        )
+        # Sanity check: both implementations agree before timing them
+        assert legacy_to_machine_cipher(plain) == to_machine_cipher(plain)
+        assert legacy_to_plain_text(cipher) == to_plain_text(cipher)
+
+        print(f"{len(plain):>7} {'encode':<8} {bench(legacy_to_machine_cipher, plain):>10.1f} {bench(to_machine_cipher, plain):>11.1f}")
+        print(f"{len(plain):>7} {'stream':<8} {'':>10} {bench(lambda text: list(iter_machine_cipher(text)), plain):>11.1f}")
+        print(f"{len(cipher):>7} {'decode':<8} {bench(legacy_to_plain_text, cipher):>10.1f} {bench(to_plain_text, cipher):>11.1f}")
@@ -0,0 +1,111 @@
+import json
+from aiohttp import web, WSMsgType
+from utils.sharding import shard_for_guild
+
+BOT_USER = {"id": "100", "username": "GrassGuyBot", "discriminator": "0", "global_name": None, "avatar": None, "bot": True}
+
+class FakeGateway:
+    # Minimal stand-in for Discord's REST API and gateway websocket: enough for a sharded
+    # client to log in, IDENTIFY, receive its shards' guilds and get reaction events.
+    # Point the bot at it with DISCORD_API_BASE and DISCORD_GATEWAY_URL.
+    def __init__(self, guild_ids, roles_per_guild=3):
+        self.guilds = {guild_id: [guild_id + i for i in range(1, roles_per_guild + 1)] for guild_id in guild_ids}
+        # shard_id -> open websocket, once that shard has identified
+        self.shards = {}
+        self.sequence = 0
+        # (method, path) of every REST call the bot made
+        self.calls = []
+
+    def guild_data(self, guild_id):
+        roles = [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                  "hoist": False, "managed": False, "mentionable": False, "flags": 0}]
+        roles += [{"id": str(role_id), "name": f"role-{role_id}", "permissions": "0", "position": position, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+                  for position, role_id in enumerate(self.guilds[guild_id], start=1)]
+        return {
+            "id": str(guild_id), "name": f"guild-{guild_id}", "owner_id": "1", "member_count": 2,
+            "roles": roles, "channels": [], "members": [], "emojis": [], "stickers": [], "features": [],
+            "threads": [], "voice_states": [], "presences": [], "large": False, "unavailable": False
+        }
+
+    async def send(self, ws, event, data):
+        self.sequence += 1
+        await ws.send_str(json.dumps({"op": 0, "t": event, "s": self.sequence, "d": data}))
+
+    async def dispatch(self, guild_id, event, data):
+        # Sent only on the shard Discord would route this guild to
+        ws = self.shards.get(shard_for_guild(guild_id, self.shard_count))
+        if ws is None:
+            return False
+        await self.send(ws, event, data)
+        return True
+
+    async def react(self, guild_id, message_id, user_id, emoji="👍"):
+        return await self.dispatch(guild_id, "MESSAGE_REACTION_ADD", {
+            "guild_id": str(guild_id), "channel_id": str(guild_id), "message_id": str(message_id),
+            "user_id": str(user_id), "emoji": {"id": None, "name": emoji}, "type": 0, "burst": False,
+            "member": {"user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None},
+                       "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+        })
+
+    async def websocket_handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": 45000}}))
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(message.data)
+            if payload["op"] == 1:
+                await ws.send_str(json.dumps({"op": 11}))
+            elif payload["op"] == 2:
+                shard_id, self.shard_count = payload["d"]["shard"]
+                owned = [guild_id for guild_id in self.guilds if shard_for_guild(guild_id, self.shard_count) == shard_id]
+                await self.send(ws, "READY", {
+                    "v": 10, "user": BOT_USER, "session_id": f"session-{shard_id}",
+                    "resume_gateway_url": str(request.url), "shard": [shard_id, self.shard_count],
+                    "application": {"id": BOT_USER["id"], "flags": 0},
+                    "guilds": [{"id": str(guild_id), "unavailable": True} for guild_id in owned]
+                })
+                for guild_id in owned:
+                    await self.send(ws, "GUILD_CREATE", self.guild_data(guild_id))
+                self.shards[shard_id] = ws
+        return ws
+
+    def json_response(self, data, status=200):
+        # discord.py only decodes bodies whose content type is exactly application/json, without a charset
+        return web.Response(body=json.dumps(data).encode(), status=status, headers={"Content-Type": "application/json"})
+
+    async def rest_handler(self, request):
+        self.calls.append((request.method, request.path))
+        path = request.path.removeprefix("/api/v10")
+        if path == "/users/@me":
+            return self.json_response(BOT_USER)
+        if path == "/oauth2/applications/@me":
+            return self.json_response({"id": BOT_USER["id"], "name": BOT_USER["username"], "description": "", "icon": None,
+                                       "bot_public": False, "bot_require_code_grant": False, "verify_key": "",
+                                       "owner": {**BOT_USER, "id": "1", "bot": False}, "flags": 0})
+        if path in ("/gateway", "/gateway/bot"):
+            return self.json_response({"url": self.gateway_url, "shards": 1,
+                                      "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}})
+        if request.method in ("PUT", "DELETE") and "/roles/" in path:
+            return web.Response(status=204)
+        return self.json_response({"message": "Unknown", "code": 0}, status=404)
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/gateway", self.websocket_handler)
+        app.router.add_route("*", "/api/v10/{path:.*}", self.rest_handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.api_base = f"http://{host}:{port}/api/v10"
+        self.gateway_url = f"ws://{host}:{port}/gateway"
+        return self.api_base
+
+    async def stop(self):
+        for ws in self.shards.values():
+            await ws.close()
+        await self.runner.cleanup()
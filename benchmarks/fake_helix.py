@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+from aiohttp import web
+
+class FakeHelix:
+    # Minimal stand-in for the Twitch Helix endpoints StreamsCog uses, with
+    # injectable latency, random 429s and a points bucket like Twitch's.
+    def __init__(self, games=50, streams_per_game=20, churn=0.05, latency=0.05, jitter=0.02,
+                 error_rate=0.0, bucket_size=800, token_ttl=3600, seed=1):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.churn = churn
+        self.bucket_size = bucket_size
+        self.bucket = bucket_size
+        self.bucket_reset = time.time() + 60
+        self.requests = {}
+        self.throttled = 0
+        # Issued tokens expire after token_ttl seconds and then get 401s
+        self.token_ttl = token_ttl
+        self.tokens = {}
+        self.unauthorized = 0
+
+        self.game_ids = [str(1000 + i) for i in range(games)]
+        self.next_stream_id = 1
+        self.streams = {game_id: [self.new_stream(game_id) for _ in range(streams_per_game)] for game_id in self.game_ids}
+
+    def new_stream(self, game_id):
+        stream_id = self.next_stream_id
+        self.next_stream_id += 1
+        return {
+            "id": str(stream_id),
+            "user_id": str(500000 + stream_id),
+            "user_login": f"streamer{stream_id}",
+            "user_name": f"Streamer{stream_id}",
+            "game_id": game_id,
+            "type": "live",
+            "title": f"Stream {stream_id}",
+            "viewer_count": self.rng.randint(1, 5000),
+            "started_at": "2024-01-01T00:00:00Z",
+            "language": "en",
+            "thumbnail_url": "https://example.invalid/{width}x{height}.jpg"
+        }
+
+    def churn_streams(self):
+        # Some streams end and new ones go live between polls
+        for game_id, streams in self.streams.items():
+            for i in range(len(streams)):
+                if self.rng.random() < self.churn:
+                    streams[i] = self.new_stream(game_id)
+
+    async def delay(self):
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def rate_limit_headers(self):
+        if time.time() >= self.bucket_reset:
+            self.bucket = self.bucket_size
+            self.bucket_reset = time.time() + 60
+        return {
+            "Ratelimit-Limit": str(self.bucket_size),
+            "Ratelimit-Remaining": str(max(0, self.bucket)),
+            "Ratelimit-Reset": str(int(self.bucket_reset))
+        }
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        await self.delay()
+        headers = self.rate_limit_headers()
+        if request.path.startswith("/helix/") and not self.authorized(request):
+            self.unauthorized += 1
+            return web.json_response({"error": "Unauthorized", "status": 401, "message": "Invalid OAuth token"}, status=401, headers=headers)
+        self.bucket -= 1
+        if self.bucket < 0 or self.rng.random() < self.error_rate:
+            self.throttled += 1
+            return web.json_response({"error": "Too Many Requests", "status": 429}, status=429, headers=headers)
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def streams_handler(self, request):
+        game_ids = request.query.getall("game_id", [])
+        first = int(request.query.get("first", 20))
+        offset = int(request.query.get("after", 0))
+        matching = [stream for game_id in game_ids for stream in self.streams.get(game_id, [])]
+        page = matching[offset:offset + first]
+        pagination = {"cursor": str(offset + first)} if offset + first < len(matching) else {}
+        return web.json_response({"data": page, "pagination": pagination})
+
+    async def users_handler(self, request):
+        user_ids = request.query.getall("id", [])
+        return web.json_response({"data": [
+            {"id": user_id, "login": f"user{user_id}", "profile_image_url": f"https://example.invalid/{user_id}.png"}
+            for user_id in user_ids
+        ]})
+
+    async def games_handler(self, request):
+        ids = request.query.getall("id", [])
+        names = request.query.getall("name", [])
+        data = [{"id": game_id, "name": f"Game {game_id}"} for game_id in ids if game_id in self.streams]
+        data += [{"id": name.split()[-1], "name": name} for name in names if name.split()[-1] in self.streams]
+        return web.json_response({"data": data})
+
+    def authorized(self, request):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        return self.tokens.get(token, 0) > time.time()
+
+    async def token_handler(self, request):
+        token = f"fake-token-{len(self.tokens) + 1}"
+        self.tokens[token] = time.time() + self.token_ttl
+        return web.json_response({"access_token": token, "expires_in": self.token_ttl, "token_type": "bearer"})
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/helix/streams", self.streams_handler)
+        app.router.add_get("/helix/users", self.users_handler)
+        app.router.add_get("/helix/games", self.games_handler)
+        app.router.add_post("/oauth2/token", self.token_handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        await self.runner.cleanup()
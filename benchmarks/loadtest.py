@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from benchmarks.fake_helix import FakeHelix
+from utils.database import close_database
+
+# Drives the cogs offline: Twitch is replaced by FakeHelix, Discord by the fakes below,
+# which only implement what the cogs actually call. Run from anywhere:
+#   python benchmarks/loadtest.py --guilds 2000 --helix-latency 0.08 --error-rate 0.02
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name, value):
+        self.samples.setdefault(name, []).append(value)
+
+    def timed(self, name):
+        recorder = self
+
+        class Timer:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc):
+                recorder.add(name, time.perf_counter() - self.start)
+        return Timer()
+
+    def report(self, name, elapsed):
+        values = sorted(self.samples.get(name, []))
+        if not values:
+            return f"{name:<28} n=0"
+        p50 = values[len(values) // 2]
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        return (f"{name:<28} n={len(values):<7} {len(values) / elapsed:9.1f}/s "
+                f"p50={p50 * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms max={values[-1] * 1000:8.2f}ms")
+
+class LoopLagSampler:
+    # Sleeps for a fixed interval and records how late the loop woke it up
+    def __init__(self, recorder, interval=0.01):
+        self.recorder = recorder
+        self.interval = interval
+        self.task = None
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.recorder.add("event_loop_lag", max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        self.task.cancel()
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.name = f"role-{role_id}"
+        self.mention = f"<@&{role_id}>"
+
+    def is_default(self):
+        return False
+
+class FakeMessage:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def edit(self, **kwargs):
+        await self.channel.env.discord_call("message.edit")
+        return self
+
+class FakeChannel:
+    def __init__(self, channel_id, guild, env):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.guild = guild
+        self.env = env
+
+    async def send(self, content=None, **kwargs):
+        await self.env.discord_call("channel.send")
+        return FakeMessage(self)
+
+class FakeMember:
+    def __init__(self, member_id, guild, env):
+        self.id = member_id
+        self.guild = guild
+        self.env = env
+        self.roles = []
+
+    async def add_roles(self, *roles, reason=None):
+        await self.env.discord_call("member.add_roles")
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.env.discord_call("member.remove_roles")
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, roles=None, reason=None):
+        await self.env.discord_call("member.edit")
+        self.roles = list(roles)
+
+class FakeGuild:
+    def __init__(self, guild_id, env, channels=2, roles=4):
+        self.id = guild_id
+        self.env = env
+        self.emojis = []
+        self.channels = {guild_id * 100 + i: FakeChannel(guild_id * 100 + i, self, env) for i in range(channels)}
+        self.roles = {guild_id * 100 + i: FakeRole(guild_id * 100 + i) for i in range(roles)}
+        self.members = {}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_member(self, user_id):
+        # Mirrors production: the member cache is off
+        return None
+
+    def member(self, user_id):
+        member = self.members.get(user_id)
+        if member is None:
+            member = self.members[user_id] = FakeMember(user_id, self, self.env)
+        return member
+
+    async def fetch_member(self, user_id):
+        await self.env.discord_call("guild.fetch_member")
+        return self.member(user_id)
+
+class FakeResponse:
+    def __init__(self, env):
+        self.env = env
+
+    async def send_message(self, content=None, **kwargs):
+        await self.env.discord_call("interaction.response")
+
+    async def defer(self, **kwargs):
+        await self.env.discord_call("interaction.defer")
+
+class FakeFollowup:
+    def __init__(self, env):
+        self.env = env
+
+    async def send(self, content=None, **kwargs):
+        await self.env.discord_call("interaction.followup")
+
+class FakeInteraction:
+    def __init__(self, guild, env):
+        self.guild = guild
+        self.channel = next(iter(guild.channels.values()))
+        self.user = SimpleNamespace(id=1, roles=[])
+        self.response = FakeResponse(env)
+        self.followup = FakeFollowup(env)
+
+class FakeClient:
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self.guild_map = {guild.id: guild for guild in guilds}
+        self.user = SimpleNamespace(id=0)
+
+    def get_guild(self, guild_id):
+        return self.guild_map.get(guild_id)
+
+class Environment:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.recorder = Recorder()
+        self.guilds = [FakeGuild(10000 + i, self) for i in range(args.guilds)]
+        self.client = FakeClient(self.guilds)
+
+    async def discord_call(self, name):
+        # Every Discord REST call costs one round trip; count them to spot call amplification
+        self.recorder.add(f"discord:{name}", self.args.discord_latency)
+        await asyncio.sleep(self.args.discord_latency)
+
+async def bench_streams(env, fake, ticks):
+    from cogs.streams import StreamsCog
+    from utils.scheduler import PollScheduler
+
+    cog = StreamsCog(env.client)
+    cog.refresh_token_task.cancel()
+    cog.automatic_stream_check.cancel()
+    # Poll every game on every tick so each tick is a full fan-out
+    cog.poll_scheduler = PollScheduler(min_interval=0, active_interval=0, quiet_interval=0)
+
+    for guild in env.guilds:
+        channel_id = next(iter(guild.channels))
+        role_id = next(iter(guild.roles))
+        for game_id in env.rng.sample(fake.game_ids, min(env.args.games_per_guild, len(fake.game_ids))):
+            cog.config_store.set_game(guild.id, game_id, role_id, channel_id)
+
+    await cog.refresh_twitch_token()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fake.churn_streams()
+        with env.recorder.timed("streams:tick"):
+            await cog.run_stream_check()
+    await cog.dispatcher.join()
+    elapsed = time.perf_counter() - start
+
+    await cog.cog_unload()
+    return elapsed
+
+async def bench_reactions(env, events):
+    from cogs.addrole import addrole
+
+    cog = addrole(env.client)
+    emojis = ["👍", "🔥", "🎮", "<:grass:1234567890>"]
+    messages = []
+    for guild in env.guilds[:50]:
+        message_id = guild.id * 1000
+        for emoji, role_id in zip(emojis, guild.roles):
+            cog.reaction_roles.add(guild.id, message_id, emoji, role_id)
+        messages.append((guild, message_id))
+
+    async def dispatch(payload, add):
+        with env.recorder.timed("addrole:event"):
+            if add:
+                await cog.on_raw_reaction_add(payload)
+            else:
+                await cog.on_raw_reaction_remove(payload)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(events):
+        guild, message_id = env.rng.choice(messages)
+        # Most reactions in a storm land on untracked messages
+        if env.rng.random() < 0.7:
+            message_id += 1
+        user_id = env.rng.randint(1, 2000)
+        add = env.rng.random() < 0.6
+        payload = SimpleNamespace(
+            message_id=message_id,
+            guild_id=guild.id,
+            user_id=user_id,
+            emoji=discord.PartialEmoji.from_str(env.rng.choice(emojis)),
+            # Add events carry the member from the gateway; removes make the cog fetch it
+            member=guild.member(user_id) if add else None
+        )
+        tasks.append(asyncio.create_task(dispatch(payload, add)))
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    await cog.role_queue.join()
+    elapsed = time.perf_counter() - start
+
+    stats = cog.role_queue.stats()
+    await cog.cog_unload()
+    return elapsed, stats
+
+async def bench_fxtwitter(env, messages):
+    from cogs.fxtwitter import TwitterLinkReplacer
+
+    cog = TwitterLinkReplacer(env.client)
+    chatter = ["lol", "gg", "brb", "anyone up for ranked tonight?", "https://example.com/status/page"]
+    start = time.perf_counter()
+    for i in range(messages):
+        guild = env.rng.choice(env.guilds[:20])
+        channel = env.rng.choice(list(guild.channels.values()))
+        if env.rng.random() < 0.05:
+            content = f"https://x.com/user{i % 50}/status/{env.rng.randint(1, 500)}"
+        else:
+            content = env.rng.choice(chatter)
+        message = SimpleNamespace(author=SimpleNamespace(id=i + 1), content=content, guild=guild, channel=channel)
+        with env.recorder.timed("fxtwitter:on_message"):
+            await cog.on_message(message)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    # Let the coalesced replies go out
+    await asyncio.sleep(cog.coalesce_window + 0.5)
+    elapsed = time.perf_counter() - start
+
+    stats = dict(cog.stats)
+    await cog.cog_unload()
+    return elapsed, stats
+
+async def bench_translate(env, commands):
+    from cogs.translate import TranslateCog
+    from utils.cipher import to_machine_cipher
+
+    cog = TranslateCog(env.client)
+    texts = ["hello there", "the quick brown fox jumps over the lazy dog " * 20, "grass " * 300]
+    ciphers = [to_machine_cipher(text) for text in texts]
+    start = time.perf_counter()
+    for i in range(commands):
+        interaction = FakeInteraction(env.rng.choice(env.guilds), env)
+        with env.recorder.timed("translate:command"):
+            if i % 2:
+                await cog.translate.callback(cog, interaction, env.rng.choice(ciphers), False)
+            else:
+                await cog.to_machine_cipher_command.callback(cog, interaction, env.rng.choice(texts), False)
+    return time.perf_counter() - start
+
+async def bench_createimage(env, commands):
+    from cogs.createimage import createimage
+
+    cog = createimage(env.client)
+    # A few distinct texts so both the render path and the cache path are exercised
+    texts = [f"touch grass {i}" for i in range(max(1, commands // 4))]
+
+    async def run(text):
+        interaction = FakeInteraction(env.rng.choice(env.guilds), env)
+        with env.recorder.timed("createimage:command"):
+            await cog.createimage.callback(cog, interaction, text)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(env.rng.choice(texts)) for _ in range(commands)))
+    elapsed = time.perf_counter() - start
+
+    await cog.cog_unload()
+    return elapsed
+
+async def main(args):
+    fake = FakeHelix(
+        games=args.games,
+        streams_per_game=args.streams_per_game,
+        churn=args.churn,
+        latency=args.helix_latency,
+        jitter=args.helix_latency / 2,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        seed=args.seed
+    )
+    base_url = await fake.start()
+    os.environ["TWITCH_HELIX_URL"] = f"{base_url}/helix"
+    os.environ["TWITCH_TOKEN_URL"] = f"{base_url}/oauth2/token"
+    os.environ.setdefault("TWITCH_CLIENT_ID", "loadtest")
+    os.environ.setdefault("TWITCH_CLIENT_SECRET", "loadtest")
+    if args.live:
+        # Edit on every tick so the edit path is fully exercised
+        os.environ["TWITCH_LIVE_ANNOUNCEMENTS"] = "1"
+        os.environ["TWITCH_LIVE_EDIT_MINUTES"] = "0"
+
+    env = Environment(args)
+    lag = LoopLagSampler(Recorder())
+    lag.start()
+
+    def scenario(name):
+        # A fresh recorder per scenario, so shared series like discord:channel.send count only its own calls
+        env.recorder = Recorder()
+        return name in args.only
+
+    sections = []
+    try:
+        if scenario("streams"):
+            elapsed = await bench_streams(env, fake, args.ticks)
+            sections.append(("streams", env.recorder, elapsed, ["streams:tick", "discord:channel.send", "discord:message.edit"],
+                             f"helix requests={sum(fake.requests.values())} throttled={fake.throttled} "
+                             f"unauthorized={fake.unauthorized} tokens issued={len(fake.tokens)}"))
+        if scenario("addrole"):
+            elapsed, stats = await bench_reactions(env, args.reactions)
+            sections.append(("addrole", env.recorder, elapsed, ["addrole:event", "discord:guild.fetch_member", "discord:member.add_roles", "discord:member.remove_roles", "discord:member.edit"],
+                             " ".join(f"{name}={value}" for name, value in stats.items())))
+        if scenario("fxtwitter"):
+            elapsed, stats = await bench_fxtwitter(env, args.messages)
+            sections.append(("fxtwitter", env.recorder, elapsed, ["fxtwitter:on_message", "discord:channel.send"],
+                             " ".join(f"{name}={value}" for name, value in stats.items())))
+        if scenario("translate"):
+            elapsed = await bench_translate(env, args.commands)
+            sections.append(("translate", env.recorder, elapsed, ["translate:command"], ""))
+        if scenario("createimage"):
+            if args.font:
+                import utils.render
+                utils.render.FONT_PATH = args.font
+            elapsed = await bench_createimage(env, args.images)
+            sections.append(("createimage", env.recorder, elapsed, ["createimage:command"], ""))
+    finally:
+        lag.stop()
+        await fake.stop()
+        close_database()
+
+    total = 0.0
+    for name, recorder, elapsed, series, extra in sections:
+        total += elapsed
+        print(f"== {name} ({elapsed:.2f}s)")
+        for series_name in series:
+            print("  " + recorder.report(series_name, elapsed))
+        if extra:
+            print(f"  {extra}")
+    print("== event loop")
+    print("  " + lag.recorder.report("event_loop_lag", total or 1.0))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the bot's cogs against a fake Helix server.")
+    parser.add_argument("--only", nargs="+", default=["streams", "addrole", "fxtwitter", "translate", "createimage"],
+                        help="Scenarios to run")
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--games", type=int, default=100, help="Games known to the fake Helix server")
+    parser.add_argument("--games-per-guild", type=int, default=3)
+    parser.add_argument("--streams-per-game", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.05, help="Fraction of streams replaced between ticks")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--reactions", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--helix-latency", type=float, default=0.05, help="Seconds per fake Helix request")
+    parser.add_argument("--discord-latency", type=float, default=0.02, help="Seconds per fake Discord REST call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Helix requests answered with 429")
+    parser.add_argument("--live", action="store_true", help="Run StreamsCog with live-updating announcements")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="Lifetime of fake OAuth tokens in seconds")
+    parser.add_argument("--font", default=None, help="TrueType font for createimage (defaults to utils.render.FONT_PATH)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.font:
+        args.font = os.path.abspath(args.font)
+
+    # The cogs keep their SQLite database (grassy.db) in the working directory; keep it out of the checkout
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(main(args))
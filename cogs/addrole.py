@@ -1,28 +1,116 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
+from utils.reaction_roles import ReactionRoleStore
+from utils.cache import TTLCache
+from utils import metrics
+import asyncio
+import time
+
+class RoleMutationQueue:
+    # Collects role changes per member for a short window, drops add/remove pairs that cancel
+    # out and applies what is left. Discord's member-role buckets are per guild, so each guild
+    # drains on its own worker at up to `rate` role requests per second.
+    def __init__(self, window=1.0, rate=5.0, on_applied=None):
+        self.window = window
+        self.rate = rate
+        self.on_applied = on_applied
+        # guild_id -> {member_id: (member, {role_id: (role, add)})}
+        self.pending = {}
+        self.workers = {}
+        self.applied = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def enqueue(self, member, role, add):
+        # coalesced counts reaction events that end up needing no request of their own
+        guild_pending = self.pending.setdefault(member.guild.id, {})
+        _, changes = guild_pending.get(member.id, (None, {}))
+        queued = changes.get(role.id)
+        if queued is not None and queued[1] != add:
+            # Undoes the queued change (a reaction added and removed within the window)
+            del changes[role.id]
+            self.coalesced += 2
+            if not changes:
+                del guild_pending[member.id]
+            return
+        if queued is not None:
+            self.coalesced += 1
+        changes[role.id] = (role, add)
+        guild_pending[member.id] = (member, changes)
+
+        if member.guild.id not in self.workers:
+            self.workers[member.guild.id] = asyncio.create_task(self.drain(member.guild.id))
+
+    async def drain(self, guild_id):
+        try:
+            while self.pending.get(guild_id):
+                await asyncio.sleep(self.window)
+                batch = self.pending.pop(guild_id, {})
+                for member, changes in batch.values():
+                    started = time.monotonic()
+                    requests = await self.apply(member, changes)
+                    await asyncio.sleep(max(0.0, requests / self.rate - (time.monotonic() - started)))
+        finally:
+            del self.workers[guild_id]
+
+    async def join(self):
+        while self.workers:
+            await asyncio.gather(*self.workers.values(), return_exceptions=True)
+
+    def cancel(self):
+        for worker in list(self.workers.values()):
+            worker.cancel()
+
+    async def apply(self, member, changes):
+        # Per-role endpoints only, and no filtering against member.roles: that snapshot can be up
+        # to a minute old, and a full role-list edit from it would revert what others changed since
+        to_add = [role for role, add in changes.values() if add]
+        to_remove = [role for role, add in changes.values() if not add]
+        try:
+            if to_remove:
+                await member.remove_roles(*to_remove, reason="Reaction role")
+            if to_add:
+                await member.add_roles(*to_add, reason="Reaction role")
+            self.applied += 1
+        except discord.HTTPException as e:
+            self.errors += 1
+            print(f"Error updating roles for {member}: {e}")
+        finally:
+            if self.on_applied:
+                self.on_applied(member)
+        return len(to_add) + len(to_remove)
+
+    def stats(self):
+        return {
+            "depth": sum(len(changes) for members in self.pending.values() for _, changes in members.values()),
+            "members": sum(len(members) for members in self.pending.values()),
+            "guilds": len(self.workers),
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "errors": self.errors
+        }
 
 class addrole(commands.Cog):
     def __init__(self, client: commands.Bot):
         self.client = client
         self.fixed_message_id = 1280264066174156943
         self.admin_role_id = 1280250785384632453
-        self.reaction_roles = self.load_reaction_roles()
-
-    def load_reaction_roles(self):
-        if os.path.exists('reaction_roles.json'):
-            try:
-                with open('reaction_roles.json', 'r') as file:
-                    return json.load(file)
-            except (json.JSONDecodeError, IOError):
-                return {}
-        return {}
-
-    def save_reaction_roles(self):
-        with open('reaction_roles.json', 'w') as file:
-            json.dump(self.reaction_roles, file, indent=4)
+        self.reaction_roles = ReactionRoleStore('reaction_roles.json', owns_guild=getattr(client, "owns_guild", None))
+        self.role_queue = RoleMutationQueue(on_applied=self.forget_member)
+        # The member cache is off, so members are fetched on demand and kept briefly
+        self.member_cache = TTLCache(maxsize=512, ttl=60)
+        metrics.register_collector(self.collect_metrics)
+
+    def collect_metrics(self):
+        values = [(f"role_queue_{name}", {}, value) for name, value in self.role_queue.stats().items()]
+        values.append(("cache_hit_rate", {"cache": "member"}, self.member_cache.stats()["hit_rate"]))
+        return values
+
+    async def cog_unload(self):
+        metrics.unregister_collector(self.collect_metrics)
+        self.role_queue.cancel()
+        await self.reaction_roles.close()
 
     async def cog_check(self, interaction: discord.Interaction) -> bool:
         guild = interaction.guild
@@ -31,21 +119,27 @@ class addrole(commands.Cog):
         admin_role = guild.get_role(self.admin_role_id)
         return admin_role in interaction.user.roles
 
+    def parse_message_id(self, message_id):
+        if message_id is None:
+            return self.fixed_message_id
+        return int(message_id) if message_id.isdigit() else None
+
     @app_commands.command(name="addreactionrole", description="Add a reaction role.")
-    async def addreactionrole(self, interaction: discord.Interaction, emoji: str, role: discord.Role):
+    @app_commands.describe(message_id="ID of the message in this channel to attach the reaction role to (optional)")
+    async def addreactionrole(self, interaction: discord.Interaction, emoji: str, role: discord.Role, message_id: str = None):
         if not await self.cog_check(interaction):
             await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
             return
 
-        if str(self.fixed_message_id) not in self.reaction_roles:
-            self.reaction_roles[str(self.fixed_message_id)] = {}
-        self.reaction_roles[str(self.fixed_message_id)][emoji] = role.id
-        self.save_reaction_roles()
+        target_message_id = self.parse_message_id(message_id)
+        if target_message_id is None:
+            await interaction.response.send_message("Invalid message ID.", ephemeral=True)
+            return
 
         # Fetch the message and add the reaction
         channel = interaction.channel
         try:
-            message = await channel.fetch_message(self.fixed_message_id)
+            message = await channel.fetch_message(target_message_id)
             await message.add_reaction(emoji)
         except discord.NotFound:
             await interaction.response.send_message("Message not found.", ephemeral=True)
@@ -57,43 +151,69 @@ class addrole(commands.Cog):
             await interaction.response.send_message(f"An error occurred: {e}", ephemeral=True)
             return
 
+        # Only stored once the message is known to exist, so a mistyped ID leaves nothing behind
+        self.reaction_roles.add(interaction.guild.id, target_message_id, emoji, role.id)
         await interaction.response.send_message(f"Added reaction role: {emoji} -> {role.name} and reacted to the message.", ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
-        message_id = str(payload.message_id)
-        emoji = str(payload.emoji)
+    @app_commands.command(name="removereactionrole", description="Remove a reaction role.")
+    @app_commands.describe(message_id="ID of the message the reaction role is attached to (optional)")
+    async def removereactionrole(self, interaction: discord.Interaction, emoji: str, message_id: str = None):
+        if not await self.cog_check(interaction):
+            await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
+            return
 
-        if message_id in self.reaction_roles:
-            if emoji in self.reaction_roles[message_id]:
-                guild = self.client.get_guild(payload.guild_id)
-                if guild is None:
-                    return
+        target_message_id = self.parse_message_id(message_id)
+        if target_message_id is None or not self.reaction_roles.remove(target_message_id, emoji):
+            await interaction.response.send_message("Reaction role not found.", ephemeral=True)
+            return
 
-                member = guild.get_member(payload.user_id)
-                role_id = self.reaction_roles[message_id][emoji]
-                role = guild.get_role(role_id)
+        await interaction.response.send_message(f"Removed reaction role: {emoji}", ephemeral=True)
 
-                if member and role:
-                    await member.add_roles(role)
+    def forget_member(self, member):
+        # Our own edits make the cached roles stale
+        self.member_cache.pop((member.guild.id, member.id))
 
-    @commands.Cog.listener()
-    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
-        message_id = str(payload.message_id)
-        emoji = str(payload.emoji)
+    async def get_member(self, guild, user_id):
+        member = guild.get_member(user_id) or self.member_cache.get((guild.id, user_id))
+        if member is None:
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.HTTPException:
+                return None
+            self.member_cache.set((guild.id, user_id), member)
+        return member
+
+    async def resolve_reaction(self, payload: discord.RawReactionActionEvent):
+        # Cheap integer check first so untracked messages never touch the emoji or guild
+        if payload.message_id not in self.reaction_roles:
+            return None, None
+
+        role_id = self.reaction_roles.lookup(payload.message_id, payload.emoji)
+        if role_id is None:
+            return None, None
+
+        guild = self.client.get_guild(payload.guild_id)
+        if guild is None:
+            return None, None
+        self.reaction_roles.claim(payload.message_id, guild.id)
 
-        if message_id in self.reaction_roles:
-            if emoji in self.reaction_roles[message_id]:
-                guild = self.client.get_guild(payload.guild_id)
-                if guild is None:
-                    return
+        # Add events carry the member; remove events only carry the user ID
+        member = payload.member or await self.get_member(guild, payload.user_id)
+        return member, guild.get_role(role_id)
 
-                member = guild.get_member(payload.user_id)
-                role_id = self.reaction_roles[message_id][emoji]
-                role = guild.get_role(role_id)
+    @commands.Cog.listener()
+    @metrics.timed("event_handler_seconds", event="on_raw_reaction_add")
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        member, role = await self.resolve_reaction(payload)
+        if member and role:
+            self.role_queue.enqueue(member, role, True)
 
-                if member and role:
-                    await member.remove_roles(role)
+    @commands.Cog.listener()
+    @metrics.timed("event_handler_seconds", event="on_raw_reaction_remove")
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        member, role = await self.resolve_reaction(payload)
+        if member and role:
+            self.role_queue.enqueue(member, role, False)
 
 async def setup(client: commands.Bot) -> None:
     await client.add_cog(addrole(client))
\ No newline at end of file
@@ -0,0 +1,101 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import asyncio
+import datetime
+import io
+import time
+from utils import metrics
+from utils.profiling import SamplingProfiler
+
+class admin(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+        self.profiling = False
+
+    async def owner_check(self, interaction: discord.Interaction) -> bool:
+        if await self.client.is_owner(interaction.user):
+            return True
+        await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+        return False
+
+    async def extension_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=ext, value=ext)
+            for ext in self.client.extensions if current.lower() in ext.lower()
+        ][:25]
+
+    # Only the cogs.* module itself is re-imported. The utils/* modules it uses are not: they hold
+    # process-wide state (the database connection, metrics registry, poll bus), so changes there need a restart.
+    @app_commands.command(name="reload", description="Reload a cog module without restarting the bot. Changes to utils/ need a restart.")
+    @app_commands.describe(extension="Extension to reload, e.g. cogs.streams")
+    @app_commands.autocomplete(extension=extension_autocomplete)
+    @app_commands.default_permissions(administrator=True)
+    async def reload(self, interaction: discord.Interaction, extension: str):
+        if not await self.owner_check(interaction):
+            return
+
+        await interaction.response.defer(ephemeral=True)
+
+        start = time.perf_counter()
+        try:
+            await self.client.reload_extension(extension)
+        except commands.ExtensionError as e:
+            await interaction.followup.send(f"Failed to reload {extension}: {e}", ephemeral=True)
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+
+        synced = await self.client.sync_commands()
+        await interaction.followup.send(
+            f"Reloaded {extension} in {elapsed:.1f} ms (utils/ changes need a restart)." + (" Command tree re-synced." if synced else ""),
+            ephemeral=True
+        )
+
+    @app_commands.command(name="metrics", description="Show bot performance metrics.")
+    @app_commands.default_permissions(administrator=True)
+    async def show_metrics(self, interaction: discord.Interaction):
+        if not await self.owner_check(interaction):
+            return
+
+        if not metrics.ENABLED:
+            await interaction.response.send_message("Metrics are disabled. Set METRICS_ENABLED=1 to turn them on.", ephemeral=True)
+            return
+
+        summary = metrics.render_summary() or "No metrics recorded yet."
+        if len(summary) > 1900:
+            await interaction.response.send_message(file=discord.File(io.BytesIO(summary.encode()), "metrics.txt"), ephemeral=True)
+        else:
+            await interaction.response.send_message(f"```\n{summary}\n```", ephemeral=True)
+
+    @app_commands.command(name="profile", description="Sample the bot process and return a flamegraph-compatible profile.")
+    @app_commands.describe(seconds="How long to sample for")
+    @app_commands.default_permissions(administrator=True)
+    async def profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 60] = 10):
+        if not await self.owner_check(interaction):
+            return
+
+        if self.profiling:
+            await interaction.response.send_message("A profile is already running.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        self.profiling = True
+        try:
+            profiler = SamplingProfiler()
+            collapsed = await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+        finally:
+            self.profiling = False
+
+        lines = [f"Collected {sum(profiler.samples.values())} samples over {seconds}s. Open profile.folded with flamegraph.pl or speedscope."]
+        watchdog = getattr(self.client, "watchdog", None)
+        if watchdog:
+            lines.append(f"Worst event loop lag since start: {watchdog.max_lag * 1000:.0f} ms")
+            for stall in list(watchdog.stalls)[-5:]:
+                when = datetime.datetime.fromtimestamp(stall["time"], datetime.timezone.utc)
+                where = f"{stall['cog']}.{stall['function']}" if stall["cog"] else "outside cogs"
+                lines.append(f"Blocked {stall['stalled'] * 1000:.0f}+ ms in {where} at <t:{int(when.timestamp())}:T>")
+
+        await interaction.followup.send("\n".join(lines), file=discord.File(io.BytesIO(collapsed.encode()), "profile.folded"), ephemeral=True)
+
+async def setup(client: commands.Bot) -> None:
+    await client.add_cog(admin(client))
@@ -1,26 +1,155 @@
 import discord
-import re
+import asyncio
 from discord import app_commands
 from discord.ext import commands
+from utils.links import PROVIDERS, DEFAULT_PROVIDER, might_contain_twitter_link, find_twitter_links, provider_link
+from utils.database import get_database
+from utils.cache import TTLCache
+from utils.ratelimit import TokenBucket
+from utils import metrics
+
+def migrate_providers(connection, data):
+    # fxtwitter_config.json: {guild_id: provider}
+    connection.executemany(
+        "INSERT OR REPLACE INTO guild_settings (guild_id, twitter_provider) VALUES (?, ?)",
+        [(int(guild_id), provider) for guild_id, provider in data.items()]
+    )
+
+class ProviderStore:
+    def __init__(self, json_path="fxtwitter_config.json", owns_guild=None, db=None):
+        self.db = db or get_database()
+        self.db.migrate_json("fxtwitter_config", json_path, migrate_providers)
+        # When sharded across processes, only guilds on this process's shards are kept
+        self.owns_guild = owns_guild or (lambda guild_id: True)
+        self.providers = {}
+        for guild_id, provider in self.db.query(
+            "SELECT guild_id, twitter_provider FROM guild_settings WHERE twitter_provider IS NOT NULL"
+        ):
+            if self.owns_guild(guild_id):
+                self.providers[guild_id] = provider
+
+    def get(self, guild_id):
+        return self.providers.get(guild_id, DEFAULT_PROVIDER)
+
+    def set(self, guild_id, provider):
+        self.providers[guild_id] = provider
+        self.db.write(
+            "INSERT INTO guild_settings (guild_id, twitter_provider) VALUES (?, ?) "
+            "ON CONFLICT (guild_id) DO UPDATE SET twitter_provider = excluded.twitter_provider",
+            (guild_id, provider)
+        )
+
+    async def close(self):
+        await self.db.flush()
 
 class TwitterLinkReplacer(commands.Cog):
     def __init__(self, client: commands.Bot):
         self.client = client
-        self.twitter_link_regex = re.compile(r'https:\/\/(?:twitter|x)\.com\/[a-zA-Z0-9]+\/status\/[a-zA-Z0-9]+')
-        self.provider = "fxtwitter" 
+        self.providers = ProviderStore("fxtwitter_config.json", owns_guild=getattr(client, "owns_guild", None))
+
+        # Per channel: status IDs rewritten recently, and a bucket limiting how often we reply
+        self.recent_links = TTLCache(maxsize=1000, ttl=3600)
+        self.reply_buckets = TTLCache(maxsize=1000, ttl=3600)
+        self.dedupe_window = 300
+        self.coalesce_window = 1.5
+        self.pending = {}
+        # Strong references, so a coalescing task can't be garbage-collected mid-wait
+        self.send_tasks = set()
+        self.stats = {"sent": 0, "failed": 0, "coalesced": 0, "suppressed_duplicate": 0, "suppressed_rate_limited": 0}
+        metrics.register_collector(self.collect_metrics)
+
+    def collect_metrics(self):
+        return [("fxtwitter_replies", {"result": name}, value) for name, value in self.stats.items()]
+
+    def channel_state(self, channel_id):
+        recent = self.recent_links.get(channel_id)
+        if recent is None:
+            recent = TTLCache(maxsize=100, ttl=self.dedupe_window)
+            self.recent_links.set(channel_id, recent)
+        bucket = self.reply_buckets.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(capacity=3, refill_rate=0.2)
+            self.reply_buckets.set(channel_id, bucket)
+        return recent, bucket
+
+    async def cog_unload(self):
+        metrics.unregister_collector(self.collect_metrics)
+        for task in list(self.send_tasks):
+            task.cancel()
+        await self.providers.close()
+
+    @app_commands.command(name="twitter-provider", description="Choose which site Twitter/X links are rewritten to.")
+    @app_commands.choices(provider=[app_commands.Choice(name=f"{name} ({host})", value=name) for name, host in PROVIDERS.items()])
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.guild_only()
+    async def twitter_provider(self, interaction: discord.Interaction, provider: app_commands.Choice[str]):
+        self.providers.set(interaction.guild.id, provider.value)
+        await interaction.response.send_message(f"Twitter links will now be rewritten to {PROVIDERS[provider.value]}.", ephemeral=True)
 
     @commands.Cog.listener()
+    @metrics.timed("event_handler_seconds", event="on_message")
     async def on_message(self, message: discord.Message):
         # Ignore messages from the bot itself
         if message.author == self.client.user:
             return
 
-        links = self.twitter_link_regex.findall(message.content)
-        if links:
-            # Prepare the modified message
-            text = '\n'.join(link.replace('twitter.com', f'{self.provider}.com').replace('x.com', f'{self.provider}.com') for link in links)
-            
-            await message.channel.send(text, reference=message)
+        if not might_contain_twitter_link(message.content):
+            return
+
+        provider = self.providers.get(message.guild.id) if message.guild else DEFAULT_PROVIDER
+        recent, bucket = self.channel_state(message.channel.id)
+
+        # Status IDs only count as sent once a reply with them went out; until then the
+        # pending reply is what suppresses repeats inside the coalesce window
+        pending = self.pending.get(message.channel.id)
+        queued = {status_id for status_id, _ in pending[1]} if pending else set()
+        links = []
+        for user, status_id in find_twitter_links(message.content):
+            if status_id in recent or status_id in queued:
+                self.stats["suppressed_duplicate"] += 1
+                continue
+            queued.add(status_id)
+            links.append((status_id, provider_link(user, status_id, provider)))
+        if not links:
+            return
+
+        # Links posted within the coalesce window share one reply to the first message
+        if pending:
+            pending[1].extend(links)
+            self.stats["coalesced"] += 1
+            return
+
+        self.pending[message.channel.id] = (message, links)
+        task = asyncio.create_task(self.send_pending(message.channel.id, bucket))
+        self.send_tasks.add(task)
+        task.add_done_callback(self.send_tasks.discard)
+
+    async def send_pending(self, channel_id, bucket):
+        await asyncio.sleep(self.coalesce_window)
+        message, links = self.pending.pop(channel_id)
+
+        if not bucket.consume():
+            self.stats["suppressed_rate_limited"] += 1
+            return
+
+        text = ""
+        included = []
+        for status_id, link in links:
+            if len(text) + len(link) + 1 > 2000:
+                break
+            text += link + "\n"
+            included.append(status_id)
+        try:
+            await message.channel.send(text.rstrip(), reference=message)
+        except discord.HTTPException as e:
+            self.stats["failed"] += 1
+            print(f"Error sending fixed links to channel {channel_id}: {e}")
+            return
+        self.stats["sent"] += 1
+
+        recent, _ = self.channel_state(channel_id)
+        for status_id in included:
+            recent.set(status_id, True)
 
 async def setup(client: commands.Bot) -> None:
     await client.add_cog(TwitterLinkReplacer(client))
@@ -1,11 +1,19 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import requests
+import asyncio
 import datetime
-import pytz
-import json
 import os
+import traceback
+from utils.twitch import HelixClient, TokenManager
+from utils.config_store import StreamConfigStore
+from utils.cache import TTLCache
+from utils.ledger import SentStreamLedger
+from utils.scheduler import PollScheduler
+from utils.eventsub import EventSubClient
+from utils.dispatch import ChannelDispatcher
+from utils.announcements import AnnouncementTracker
+from utils import metrics
 
 class StreamsCog(commands.Cog):
     
@@ -14,122 +22,192 @@ class StreamsCog(commands.Cog):
     def __init__(self, client: commands.Bot):
         self.client = client
         self.config_file = "stream_config.json"
-        self.sent_streams = {}
+        self.config_store = StreamConfigStore(self.config_file, owns_guild=getattr(client, "owns_guild", None))
+
+        # With several worker processes, worker 0 polls Twitch for everyone (see utils/sharding.py)
+        self.poll_bus = getattr(client, "poll_bus", None)
+        self.bus_task = None
+        self.remote_seen = TTLCache(maxsize=10000, ttl=3600)
+        worker_index = self.poll_bus.worker_index if self.poll_bus else 0
+        # The JSON file is only read once, to migrate it into the database
+        ledger_file = f"sent_streams.{worker_index}.json" if self.poll_bus else "sent_streams.json"
+        self.sent_streams = SentStreamLedger(worker_index, ledger_file)
+        # With an empty ledger (first deploy) each game's first poll only records what is
+        # already live, instead of announcing every one of those streams at once
+        self.prime_ledger = len(self.sent_streams) == 0
+        self.primed_games = set()
         self.notifications_active = True
+        self.games_per_request = 100
+        self.max_stream_pages = 5
+        # Only a game's most-watched streams are announced; 20 is Helix's default page size,
+        # which is what one-game-per-request polling used to see
+        self.streams_per_game = int(os.getenv('TWITCH_STREAMS_PER_GAME') or 20)
+        self.poll_scheduler = PollScheduler()
+        self.check_lock = asyncio.Lock()
+        # Announcement sends run in the background so one slow channel never holds up a poll tick
+        self.dispatcher = ChannelDispatcher(max_concurrency=10)
+        # Optional live mode: posted announcements are edited from later poll data and marked offline when the stream ends
+        self.tracker = None
+        if os.getenv('TWITCH_LIVE_ANNOUNCEMENTS', '').lower() in ('1', 'true', 'yes'):
+            self.tracker = AnnouncementTracker(edit_interval=float(os.getenv('TWITCH_LIVE_EDIT_MINUTES') or 5) * 60)
+        self.incomplete_games = set()
+        self.unpolled_games = set()
+
+        self.game_name_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+        self.game_id_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+        self.profile_image_cache = TTLCache(maxsize=4096, ttl=6 * 3600)
 
         self.TWITCH_CLIENT_ID = os.getenv('TWITCH_CLIENT_ID')
         self.TWITCH_OAUTH_TOKEN = os.getenv('TWITCH_OAUTH_TOKEN')
         self.TWITCH_REFRESH_TOKEN = os.getenv('TWITCH_REFRESH_TOKEN')
         self.TWITCH_CLIENT_SECRET = os.getenv('TWITCH_CLIENT_SECRET')
+        self.helix = HelixClient(
+            self.TWITCH_CLIENT_ID,
+            self.TWITCH_OAUTH_TOKEN,
+            base_url=os.getenv('TWITCH_HELIX_URL'),
+            token_url=os.getenv('TWITCH_TOKEN_URL')
+        )
+        # Without a refresh token this falls back to an app access token
+        self.token_manager = TokenManager(
+            self.helix,
+            self.TWITCH_CLIENT_ID,
+            self.TWITCH_CLIENT_SECRET,
+            refresh_token=self.TWITCH_REFRESH_TOKEN
+        )
+
+        # Optional EventSub mode: stream.online pushes for broadcasters already seen live; polling
+        # keeps its normal cadence because only polling finds streamers new to a category
+        self.eventsub = None
+        self.eventsub_task = None
+        if os.getenv('TWITCH_EVENTSUB', '').lower() in ('1', 'true', 'yes') and (self.poll_bus is None or self.poll_bus.is_poller):
+            # Twitch only accepts WebSocket subscriptions made with a user access token, i.e. the
+            # refresh-token grant; with the app token fallback every subscribe would fail
+            if self.token_manager.grant_type != "refresh_token":
+                print("EventSub disabled: WebSocket subscriptions need a user token (set TWITCH_REFRESH_TOKEN); polling only")
+            else:
+                self.eventsub = EventSubClient(
+                    self.helix,
+                    self.on_stream_online,
+                    ws_url=os.getenv('TWITCH_EVENTSUB_WS_URL'),
+                    subscriptions_url=os.getenv('TWITCH_EVENTSUB_SUBSCRIPTIONS_URL')
+                )
+                self.eventsub_task = asyncio.create_task(self.eventsub.run())
+
+        if self.poll_bus:
+            self.bus_task = asyncio.create_task(self.poll_bus.listen(self.on_bus_streams))
+
+        metrics.register_collector(self.collect_metrics)
 
-        self.token_expiry = datetime.datetime.utcnow()
         self.refresh_token_task.start()
         self.automatic_stream_check.start()
 
+    async def cog_unload(self):
+        self.refresh_token_task.cancel()
+        self.automatic_stream_check.cancel()
+        if self.eventsub_task:
+            self.eventsub_task.cancel()
+            self.eventsub.close()
+        if self.bus_task:
+            self.bus_task.cancel()
+        metrics.unregister_collector(self.collect_metrics)
+        await self.dispatcher.close()
+        await self.helix.close()
+        await self.config_store.close()
+        await self.sent_streams.close()
+
+    def collect_metrics(self):
+        values = [
+            ("sent_streams_tracked", {}, len(self.sent_streams)),
+            ("poll_scheduler_games", {}, len(self.poll_scheduler.games)),
+            ("announcement_queue_depth", {}, self.dispatcher.depth()),
+            ("announcements_tracked", {}, len(self.tracker) if self.tracker is not None else 0)
+        ]
+        values += [("announcements", {"result": name}, value) for name, value in self.dispatcher.stats.items()]
+        for name, cache in (("game_name", self.game_name_cache), ("game_id", self.game_id_cache), ("profile_image", self.profile_image_cache)):
+            stats = cache.stats()
+            values.append(("cache_hit_rate", {"cache": name}, stats["hit_rate"]))
+            values.append(("cache_entries", {"cache": name}, stats["size"]))
+        return values
+
     def get_server_config(self, guild_id):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as file:
-                config = json.load(file)
-            return config.get(str(guild_id), {})
-        return {}
+        return self.config_store.get(guild_id)
 
     def set_server_config(self, guild_id, role_id, stream_channel_id, game_id, notifications_active=None):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as file:
-                config = json.load(file)
-        else:
-            config = {}
-
-        if str(guild_id) not in config:
-            config[str(guild_id)] = {'notifications_active': True} 
-
         if notifications_active is not None:
-            config[str(guild_id)]['notifications_active'] = notifications_active
+            self.config_store.set_notifications(guild_id, notifications_active)
 
         if game_id:
-            if game_id not in config[str(guild_id)]:
-                config[str(guild_id)][game_id] = {}
-
-            config[str(guild_id)][game_id]['role_id'] = role_id
-            config[str(guild_id)][game_id]['stream_channel_id'] = stream_channel_id
-
-        with open(self.config_file, 'w') as file:
-            json.dump(config, file, indent=4)
+            self.config_store.set_game(guild_id, game_id, role_id, stream_channel_id)
 
     def remove_server_config(self, guild_id, game_id):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as file:
-                config = json.load(file)
-        else:
-            config = {}
-
-        if str(guild_id) in config and game_id in config[str(guild_id)]:
-            del config[str(guild_id)][game_id]
+        return self.config_store.remove_game(guild_id, game_id)
 
-            if not config[str(guild_id)]:
-                del config[str(guild_id)]
-
-            with open(self.config_file, 'w') as file:
-                json.dump(config, file, indent=4)
-            return True
-        return False
+    def cache_game(self, game):
+        self.game_name_cache.set(game["id"], game["name"])
+        self.game_id_cache.set(game["name"].lower(), game["id"])
 
     async def get_game_id_from_name(self, game_name):
-        url = "https://api.twitch.tv/helix/games"
-        headers = {
-            "Client-ID": self.TWITCH_CLIENT_ID,
-            "Authorization": "Bearer " + self.TWITCH_OAUTH_TOKEN
-        }
-        params = {
-            "name": game_name
-        }
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
+        game_id = self.game_id_cache.get(game_name.lower())
+        if game_id:
+            return game_id
+
+        status, data = await self.helix.get("games", {"name": game_name})
+        if status == 200:
             games = data["data"]
             if games:
+                self.cache_game(games[0])
                 return games[0]["id"]
         else:
-            print(f"Error fetching game ID: {response.status_code} - {response.text}")
+            print(f"Error fetching game ID: {status} - {data}")
         return None
 
     async def get_game_name_from_id(self, game_id):
-        url = "https://api.twitch.tv/helix/games"
-        headers = {
-            "Client-ID": self.TWITCH_CLIENT_ID,
-            "Authorization": "Bearer " + self.TWITCH_OAUTH_TOKEN
-        }
-        params = {
-            "id": game_id
-        }
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            games = data["data"]
-            if games:
-                return games[0]["name"]
-        else:
-            print(f"Error fetching game name: {response.status_code} - {response.text}")
-        return None
+        names = await self.get_game_names([game_id])
+        return names.get(game_id)
+
+    async def get_game_names(self, game_ids):
+        names = {}
+        missing = []
+        for game_id in game_ids:
+            name = self.game_name_cache.get(game_id)
+            if name:
+                names[game_id] = name
+            elif game_id not in missing:
+                missing.append(game_id)
+
+        for i in range(0, len(missing), 100):
+            status, data = await self.helix.get("games", [("id", game_id) for game_id in missing[i:i + 100]])
+            if status == 200:
+                for game in data["data"]:
+                    self.cache_game(game)
+                    names[game["id"]] = game["name"]
+            else:
+                print(f"Error fetching game name: {status} - {data}")
+        return names
 
     async def get_user_profile_image(self, user_id):
-        url = f"https://api.twitch.tv/helix/users"
-        headers = {
-            "Client-ID": self.TWITCH_CLIENT_ID,
-            "Authorization": "Bearer " + self.TWITCH_OAUTH_TOKEN
-        }
-        params = {
-            "id": user_id
-        }
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            users = data.get('data', [])
-            if users:
-                return users[0].get('profile_image_url')
-        else:
-            print(f"Error fetching user profile image: {response.status_code} - {response.text}")
-        return None
+        images = await self.get_user_profile_images([user_id])
+        return images.get(user_id)
+
+    async def get_user_profile_images(self, user_ids):
+        images = {}
+        missing = []
+        for user_id in user_ids:
+            image = self.profile_image_cache.get(user_id)
+            if image:
+                images[user_id] = image
+            elif user_id not in missing:
+                missing.append(user_id)
+
+        for i in range(0, len(missing), 100):
+            status, data = await self.helix.get("users", [("id", user_id) for user_id in missing[i:i + 100]])
+            if status == 200:
+                for user in data.get('data', []):
+                    self.profile_image_cache.set(user["id"], user.get('profile_image_url'))
+                    images[user["id"]] = user.get('profile_image_url')
+            else:
+                print(f"Error fetching user profile image: {status} - {data}")
+        return images
 
     @twitch_group.command(name="setup", description="Set up streams with role, channel, and game.")
     @app_commands.describe(role="Choose the role to be pinged (optional)", channel="Select the channel for streams", game="Enter the Twitch game name or ID")
@@ -153,22 +231,20 @@ class StreamsCog(commands.Cog):
         await interaction.response.defer()
 
         config = self.get_server_config(interaction.guild.id)
-        if not config or 'notifications_active' not in config:
+        if not config:
             await interaction.followup.send("No stream settings found.")
             return
 
         embed = discord.Embed(title="Current Stream Settings", color=discord.Color.blue())
-        embed.add_field(name="Notifications Active", value="Yes" if config['notifications_active'] else "No")
-
-        for game_id, settings in config.items():
-            if game_id == 'notifications_active':
-                continue  # Skip the notifications_active field
+        embed.add_field(name="Notifications Active", value="Yes" if config.notifications_active else "No")
 
-            role_id = settings.get('role_id')
-            channel_id = settings['stream_channel_id']
+        game_names = await self.get_game_names(list(config.games))
+        for game_id, settings in config.games.items():
+            role_id = settings.role_id
+            channel_id = settings.stream_channel_id
             role = interaction.guild.get_role(role_id) if role_id else None
             channel = interaction.guild.get_channel(channel_id)
-            game_name = await self.get_game_name_from_id(game_id)
+            game_name = game_names.get(game_id)
 
             embed.add_field(name=f"Game: {game_name} (ID: {game_id})", 
                             value=f"Role: {role.name if role else 'None'}\nChannel: {channel.name if channel else 'Unknown'}", 
@@ -211,20 +287,16 @@ class StreamsCog(commands.Cog):
                 return
 
         config = self.get_server_config(interaction.guild.id)
-        if not config or game_id not in config:
+        if not config or game_id not in config.games:
             await interaction.followup.send("Stream setting for the specified game not found.")
             return
 
-        updated = False
-        if role:
-            config[game_id]['role_id'] = role.id
-            updated = True
-        if channel:
-            config[game_id]['stream_channel_id'] = channel.id
-            updated = True
+        settings = config.games[game_id]
+        role_id = role.id if role else settings.role_id
+        stream_channel_id = channel.id if channel else settings.stream_channel_id
 
-        if updated:
-            self.set_server_config(interaction.guild.id, config[game_id]['role_id'], config[game_id]['stream_channel_id'], game_id)
+        if role or channel:
+            self.set_server_config(interaction.guild.id, role_id, stream_channel_id, game_id)
             await interaction.followup.send(f"Stream setting updated for Game ID: {game_id}. Role and/or channel has been changed.")
         else:
             await interaction.followup.send("No changes were made.")
@@ -234,116 +306,307 @@ class StreamsCog(commands.Cog):
     async def togglenotifications(self, interaction: discord.Interaction, notifications_active: bool):
         await interaction.response.defer()
 
-        config = self.get_server_config(interaction.guild.id)
-
-        if 'notifications_active' not in config:
-            config['notifications_active'] = True 
+        self.set_server_config(interaction.guild.id, None, None, None, notifications_active=notifications_active) 
 
-        config['notifications_active'] = notifications_active
-    
-        self.set_server_config(interaction.guild.id, None, None, None, notifications_active=config['notifications_active']) 
-
-        status = "active" if config['notifications_active'] else "inactive"
+        status = "active" if notifications_active else "inactive"
         await interaction.followup.send(f"Stream notifications are now {status}.")
 
-    @tasks.loop(minutes=30)
+    @tasks.loop(minutes=1)
     async def refresh_token_task(self):
-        self.refresh_twitch_token()
+        # Only refreshes once the token is within the manager's margin of expiring
+        await self.token_manager.ensure()
 
-    @tasks.loop(seconds=2)
+    @tasks.loop(seconds=1)
     async def automatic_stream_check(self):
         if not self.notifications_active:
             return
 
+        # Skip the tick outright if the previous one is still running
+        if self.check_lock.locked():
+            return
+
+        async with self.check_lock:
+            with metrics.timer("stream_check_tick_seconds"):
+                try:
+                    await self.run_stream_check()
+                except Exception:
+                    # An exception would stop the tasks.loop for good; log it and poll again next tick
+                    traceback.print_exc()
+
+    async def run_stream_check(self):
+        plan = self.build_poll_plan()
+        if self.poll_bus and not self.poll_bus.is_poller:
+            # Worker 0 polls for us; keep it told which games our guilds follow
+            self.poll_bus.publish_games(plan)
+            return
+
+        poll_games = set(plan)
+        if self.poll_bus:
+            poll_games |= self.poll_bus.wanted_games()
+
+        self.poll_scheduler.sync(poll_games)
+        if not poll_games:
+            return
+
+        # The first round of a batch of games_per_request games takes up to max_stream_pages
+        # requests; re-query rounds are checked against the budget in check_twitch_streams
+        limit = None
+        budget = self.helix.rate_limit_budget()
+        if budget is not None:
+            batches = budget // self.max_stream_pages
+            if batches == 0:
+                return
+            limit = batches * self.games_per_request
+
+        due_games = self.poll_scheduler.due(limit=limit)
+        if not due_games:
+            return
+
+        await self.token_manager.ensure()
+
+        streams_by_game = await self.check_twitch_streams(due_games)
+        polled = set(due_games) - self.incomplete_games
+        if self.poll_bus:
+            self.poll_bus.publish_streams({game_id: streams_by_game.get(game_id, []) for game_id in due_games}, polled)
+
+        new_counts = await self.handle_streams(plan, due_games, streams_by_game, polled)
+        for game_id in due_games:
+            if game_id in self.unpolled_games:
+                # Skipped for lack of budget; still due next tick
+                continue
+            streams = streams_by_game.get(game_id, [])
+            if game_id not in plan:
+                # Only polled for other workers, so track newness separately from our own ledger
+                new_counts[game_id] = sum(1 for stream in streams if stream['id'] not in self.remote_seen)
+                for stream in streams:
+                    self.remote_seen.set(stream['id'], True)
+            self.poll_scheduler.record(game_id, len(streams), new_counts.get(game_id, 0))
+
+    async def handle_streams(self, plan, game_ids, streams_by_game, polled=()):
+        self.sent_streams.touch(stream['id'] for streams in streams_by_game.values() for stream in streams)
+        self.sent_streams.expire()
+        if self.tracker is not None:
+            self.update_announcements(streams_by_game, polled)
+
+        local_games = [game_id for game_id in game_ids if game_id in plan]
+        if self.prime_ledger:
+            for game_id in local_games:
+                if game_id not in self.primed_games:
+                    self.primed_games.add(game_id)
+                    self.sent_streams.add_many(
+                        stream['id'] for stream in streams_by_game.get(game_id, []) if stream['id'] not in self.sent_streams
+                    )
+
+        # Resolve every uncached streamer in one /helix/users call before building embeds
+        new_user_ids = [
+            stream['user_id'] for game_id in local_games for stream in streams_by_game.get(game_id, [])
+            if stream['id'] not in self.sent_streams
+        ]
+        if new_user_ids:
+            await self.get_user_profile_images(new_user_ids)
+
+        if self.eventsub:
+            self.eventsub.track(stream['user_id'] for streams in streams_by_game.values() for stream in streams)
+
+        new_counts = {}
+        for game_id in local_games:
+            new_counts[game_id] = 0
+            for stream in streams_by_game.get(game_id, []):
+                if await self.announce_stream(stream, plan[game_id]):
+                    new_counts[game_id] += 1
+        return new_counts
+
+    async def on_bus_streams(self, streams_by_game, polled):
+        async with self.check_lock:
+            plan = self.build_poll_plan()
+            await self.handle_streams(plan, list(streams_by_game), streams_by_game, polled)
+
+    def update_announcements(self, streams_by_game, polled):
+        # Works only from data the poll already fetched; never calls Helix itself
+        seen_ids = set()
+        for streams in streams_by_game.values():
+            for stream in streams:
+                seen_ids.add(stream['id'])
+                self.tracker.seen(stream)
+
+        for entry in self.tracker.due_edits():
+            game_name = self.game_name_cache.get(entry.stream['game_id']) or entry.game_name
+            self.edit_announcements(entry, self.stream_embed(entry.stream, game_name, entry.profile_image_url))
+
+        for entry in self.tracker.ended(polled, seen_ids):
+            self.edit_announcements(entry, self.stream_embed(entry.stream, entry.game_name, entry.profile_image_url, ended_at=entry.last_seen))
+
+    def edit_announcements(self, entry, embed):
+        stream_id = entry.stream['id']
+        for message in list(entry.messages):
+            future = self.dispatcher.submit_edit(message, embed=embed)
+            # Stop editing messages that were deleted or became unreachable
+            future.add_done_callback(
+                lambda future, message=message: future.cancelled() or future.result() or self.tracker.forget_message(stream_id, message)
+            )
+
+    async def on_stream_online(self, event):
+        status, data = await self.helix.get("streams", {"user_id": event["broadcaster_user_id"]})
+        if status != 200:
+            print(f"Error fetching streams: {status} - {data}")
+            return
+
+        if self.poll_bus:
+            streams_by_game = {}
+            for stream in data["data"]:
+                streams_by_game.setdefault(stream["game_id"], []).append(stream)
+            self.poll_bus.publish_streams(streams_by_game)
+
+        plan = self.build_poll_plan()
+        for stream in data["data"]:
+            if stream["game_id"] in plan:
+                await self.announce_stream(stream, plan[stream["game_id"]])
+
+    async def announce_stream(self, stream, targets):
+        stream_id = stream['id']
+        if stream_id in self.sent_streams:
+            return False
+
+        # Claim the stream before awaiting so polling and EventSub can't both announce it
+        self.sent_streams.add(stream_id)
+
+        # One embed per stream, shared by every guild that follows the game
+        game_name = await self.get_game_name_from_id(stream['game_id'])
+        profile_image_url = await self.get_user_profile_image(stream['user_id'])
+        embed = self.stream_embed(stream, game_name, profile_image_url)
+        if self.tracker is not None:
+            self.tracker.track(stream, game_name, profile_image_url)
+
+        for guild, settings in targets:
+            stream_channel = guild.get_channel(settings.stream_channel_id)
+            role_id = settings.role_id
+            role = guild.get_role(role_id) if role_id else None
+
+            if stream_channel:
+                future = self.dispatcher.submit(stream_channel, content=role.mention if role else '', embed=embed)
+                if self.tracker is not None:
+                    future.add_done_callback(
+                        lambda future: future.cancelled() or not future.result() or self.tracker.add_message(stream_id, future.result())
+                    )
+        return True
+
+    def build_poll_plan(self):
+        # game_id -> [(guild, settings), ...] so each game is fetched once per tick
+        plan = {}
         for guild in self.client.guilds:
             config = self.get_server_config(guild.id)
-            if not config or not config.get('notifications_active', True):
+            if not config or not config.notifications_active:
                 continue
 
-            if datetime.datetime.utcnow() > self.token_expiry:
-                self.refresh_twitch_token()
-
-            for game_id, settings in config.items():
-                if isinstance(settings, dict):
-                    stream_channel_id = settings.get('stream_channel_id')
-                    role_id = settings.get('role_id')
-                    stream_channel = guild.get_channel(stream_channel_id)
-                    role = guild.get_role(role_id) if role_id else None
-
-                    streams = await self.check_twitch_streams(game_id)
-                    for stream in streams:
-                        stream_id = stream['id']
-                        if stream_id not in self.sent_streams:
-                            stream_link = f"https://www.twitch.tv/{stream['user_login']}"
-                            thumbnail_url = stream.get('thumbnail_url', '').replace('{width}', '1920').replace('{height}', '1080')
-                            user_name = stream['user_name']
-                            profile_image_url = await self.get_user_profile_image(stream['user_id'])
-
-                            game_box_art_url = f"https://static-cdn.jtvnw.net/ttv-boxart/{game_id}_IGDB-90x120.jpg"
-
-                            start_time_utc = datetime.datetime.strptime(stream['started_at'], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=pytz.utc)
-                            local_tz = pytz.timezone('America/New_York')  
-                            start_time_local = start_time_utc.astimezone(local_tz) 
-                            unix_timestamp = int(start_time_local.timestamp())
-
-                            current_time = datetime.datetime.now(local_tz)  
-                            uptime_duration = current_time - start_time_local
-                            hours, remainder = divmod(int(uptime_duration.total_seconds()), 3600)
-                            minutes, _ = divmod(remainder, 60)
-                            uptime = f"{hours}h {minutes}m"
-
-                            embed = discord.Embed(
-                                title=stream['title'],
-                                url=stream_link,
-                                description=f"{user_name} is streaming {await self.get_game_name_from_id(game_id)} with {stream['viewer_count']} viewers.\n[Watch]({stream_link})",
-                                color=discord.Color.purple()
-                            )
-                            embed.add_field(name="Uptime", value=uptime, inline=True)
-                            embed.add_field(name="Language", value=stream.get('language', 'Unknown'), inline=True)
-                            embed.add_field(name="Started at", value=f"<t:{unix_timestamp}:f>", inline=True)
-                            embed.set_thumbnail(url=game_box_art_url)
-                            embed.set_image(url=thumbnail_url) 
-                            embed.set_author(name=user_name, icon_url=profile_image_url)
-                            embed.set_footer(text="Powered by Twitch API")
-
-                            if stream_channel:
-                                await stream_channel.send(content=role.mention if role else '', embed=embed)
-
-                            self.sent_streams[stream_id] = True
-
-    def refresh_twitch_token(self):
-        url = "https://id.twitch.tv/oauth2/token"
-        params = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.TWITCH_REFRESH_TOKEN,
-            "client_id": self.TWITCH_CLIENT_ID,
-            "client_secret": self.TWITCH_CLIENT_SECRET
-        }
-        response = requests.post(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            self.TWITCH_OAUTH_TOKEN = data["access_token"]
-            self.token_expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=data["expires_in"])
-        else:
-            print(f"Error refreshing token: {response.status_code} - {response.text}")
-
-    async def check_twitch_streams(self, game_id):
-        url = "https://api.twitch.tv/helix/streams"
-        headers = {
-            "Client-ID": self.TWITCH_CLIENT_ID,
-            "Authorization": "Bearer " + self.TWITCH_OAUTH_TOKEN
-        }
-        params = {
-            "game_id": game_id,
-            "type": "live"
-        }
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return data["data"]
+            for game_id, settings in config.games.items():
+                plan.setdefault(game_id, []).append((guild, settings))
+        return plan
+
+    def stream_embed(self, stream, game_name, profile_image_url, ended_at=None):
+        stream_link = f"https://www.twitch.tv/{stream['user_login']}"
+        thumbnail_url = stream.get('thumbnail_url', '').replace('{width}', '1920').replace('{height}', '1080')
+        user_name = stream['user_name']
+        game_id = stream['game_id']
+
+        game_box_art_url = f"https://static-cdn.jtvnw.net/ttv-boxart/{game_id}_IGDB-90x120.jpg"
+
+        # Discord renders <t:...> in each viewer's own timezone, so UTC is all we need here
+        start_time_utc = datetime.datetime.strptime(stream['started_at'], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=datetime.timezone.utc)
+        unix_timestamp = int(start_time_utc.timestamp())
+
+        current_time = ended_at or datetime.datetime.now(datetime.timezone.utc)
+        uptime_duration = current_time - start_time_utc
+        hours, remainder = divmod(int(uptime_duration.total_seconds()), 3600)
+        minutes, _ = divmod(remainder, 60)
+        uptime = f"{hours}h {minutes}m"
+
+        if ended_at:
+            embed = discord.Embed(
+                title=f"[Offline] {stream['title']}",
+                url=stream_link,
+                description=f"{user_name} was streaming {game_name}. The stream has ended.",
+                color=discord.Color.dark_grey()
+            )
         else:
-            print(f"Error fetching streams: {response.status_code} - {response.text}")
-        return []
+            embed = discord.Embed(
+                title=stream['title'],
+                url=stream_link,
+                description=f"{user_name} is streaming {game_name} with {stream['viewer_count']} viewers.\n[Watch]({stream_link})",
+                color=discord.Color.purple()
+            )
+        embed.add_field(name="Uptime", value=uptime, inline=True)
+        embed.add_field(name="Language", value=stream.get('language', 'Unknown'), inline=True)
+        embed.add_field(name="Started at", value=f"<t:{unix_timestamp}:f>", inline=True)
+        embed.set_thumbnail(url=game_box_art_url)
+        if not ended_at:
+            embed.set_image(url=thumbnail_url)
+        embed.set_author(name=user_name, icon_url=profile_image_url)
+        embed.set_footer(text="Powered by Twitch API")
+        return embed
+
+    async def refresh_twitch_token(self):
+        return await self.token_manager.refresh()
+
+    async def check_twitch_streams(self, game_ids):
+        # /helix/streams takes up to 100 game_id params per request and pages with a cursor.
+        # Each game keeps its top streams_per_game streams; games from batches that failed or
+        # were cut off by the page cap short of that are left in incomplete_games. Games the
+        # rate-limit budget couldn't cover are also left in unpolled_games
+        streams = {}
+        self.incomplete_games = set()
+        self.unpolled_games = set()
+        for i in range(0, len(game_ids), self.games_per_request):
+            pending = game_ids[i:i + self.games_per_request]
+            while pending:
+                # Every round, re-queries included, can take up to max_stream_pages requests
+                budget = self.helix.rate_limit_budget()
+                if budget is not None and budget < self.max_stream_pages:
+                    self.unpolled_games.update(pending)
+                    self.unpolled_games.update(game_ids[i + self.games_per_request:])
+                    self.incomplete_games.update(self.unpolled_games)
+                    return streams
+
+                batch_streams, complete = await self.fetch_stream_pages(pending)
+                for game_id, game_streams in batch_streams.items():
+                    streams[game_id] = game_streams[:self.streams_per_game]
+                if complete is None:
+                    self.incomplete_games.update(pending)
+                    break
+                if complete:
+                    break
+
+                # Results come back ranked by viewers across the whole batch, so popular games can
+                # fill every page. A game with streams_per_game results already has its top streams,
+                # one with fewer may have more past the cap, and one with none is asked for again
+                self.incomplete_games.update(
+                    game_id for game_id, game_streams in batch_streams.items() if len(game_streams) < self.streams_per_game
+                )
+                pending = [game_id for game_id in pending if game_id not in batch_streams]
+        return streams
+
+    async def fetch_stream_pages(self, game_ids):
+        # Returns (streams_by_game, complete); complete is False when the page cap cut the
+        # results short and None when a request failed
+        streams = {}
+        params = [("game_id", game_id) for game_id in game_ids]
+        params += [("type", "live"), ("first", "100")]
+        cursor = None
+        for _ in range(self.max_stream_pages):
+            status, data = await self.helix.get("streams", params + ([("after", cursor)] if cursor else []))
+            if status != 200:
+                print(f"Error fetching streams: {status} - {data}")
+                return streams, None
+
+            for stream in data["data"]:
+                streams.setdefault(stream["game_id"], []).append(stream)
+
+            cursor = data.get("pagination", {}).get("cursor")
+            if not cursor or not data["data"]:
+                return streams, True
+            # Later pages only hold lower-ranked streams; stop once every game has its top streams
+            if all(len(streams.get(game_id, ())) >= self.streams_per_game for game_id in game_ids):
+                return streams, True
+        return streams, False
 
 async def setup(client: commands.Bot):
     await client.add_cog(StreamsCog(client))
@@ -2,35 +2,152 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from dotenv import load_dotenv
+import asyncio
+import hashlib
+import json
 import os
 import platform
+import time
+import yarl
+from utils.sharding import shard_for_guild
+from utils import metrics
+from utils.profiling import watchdog_from_env
+from utils.database import close_database
 
 load_dotenv()
 
 TOKEN = os.getenv('TOKEN')
 
-class Client(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix=commands.when_mentioned_or('.'), intents=discord.Intents().all())
+# Extension -> the gateway intents it needs. Kept here rather than in the cog modules so
+# building the intents doesn't import every cog before load_extension imports it again.
+COGS = {
+    "cogs.admin": (),
+    "cogs.addrole": ("guilds", "guild_reactions"),
+    "cogs.streams": ("guilds",),
+    "cogs.createimage": (),
+    "cogs.translate": ("guilds", "emojis_and_stickers"),
+    "cogs.fxtwitter": ("guilds", "guild_messages", "dm_messages", "message_content")
+}
 
-        self.cogslist = [
-            "cogs.addrole",
-            "cogs.streams",
-            "cogs.createimage",
-            "cogs.translate",
-            "cogs.fxtwitter"
-        ]
+COMMAND_HASH_FILE = ".command_tree_hash"
 
-    async def setup_hook(self):
-        for ext in self.cogslist:
+# Lets a local mock gateway stand in for Discord, e.g. DISCORD_API_BASE=http://127.0.0.1:8080/api/v10
+if os.getenv('DISCORD_API_BASE'):
+    discord.http.Route.BASE = os.getenv('DISCORD_API_BASE')
+# With a fixed shard count discord.py skips GET /gateway/bot and dials DEFAULT_GATEWAY directly,
+# so the websocket needs its own override, e.g. DISCORD_GATEWAY_URL=ws://127.0.0.1:8080/gateway
+if os.getenv('DISCORD_GATEWAY_URL'):
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.getenv('DISCORD_GATEWAY_URL'))
+
+def build_intents(cogs):
+    # Request only the union of the intents the loaded cogs need
+    intents = discord.Intents.none()
+    intents.guilds = True
+    for names in cogs.values():
+        for name in names:
+            setattr(intents, name, True)
+    return intents
+
+class Client(commands.AutoShardedBot):
+    def __init__(self, shard_ids=None, shard_count=None, worker_index=0, poll_bus=None):
+        intents = build_intents(COGS)
+        super().__init__(
+            command_prefix=commands.when_mentioned_or('.'),
+            intents=intents,
+            member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+            chunk_guilds_at_startup=False,
+            shard_ids=shard_ids,
+            shard_count=shard_count
+        )
+
+        self.cogslist = list(COGS)
+        self.startup_timings = {}
+        # Set by launcher.py when shards are spread over several processes
+        self.worker_index = worker_index
+        self.worker_shard_ids = set(shard_ids) if shard_ids is not None else None
+        self.poll_bus = poll_bus
+        self.watchdog = None
+
+    def owns_guild(self, guild_id):
+        if self.worker_shard_ids is None:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.worker_shard_ids
+
+    async def load_timed(self, ext):
+        start = time.perf_counter()
+        try:
             await self.load_extension(ext)
+        except commands.ExtensionError as e:
+            print(f"Failed to load {ext}: {e}")
+        self.startup_timings[ext] = time.perf_counter() - start
+
+    async def setup_hook(self):
+        self.watchdog = watchdog_from_env()
+        if self.watchdog:
+            self.watchdog.start()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.load_timed(ext) for ext in self.cogslist))
+
+        print("Extension startup times:")
+        for ext, elapsed in sorted(self.startup_timings.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {ext:<20} {elapsed * 1000:8.1f} ms")
+        print(f"  {'total':<20} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        if metrics.ENABLED:
+            # One port per worker process, counting up from METRICS_PORT
+            port = int(os.getenv('METRICS_PORT') or 9108) + self.worker_index
+            await metrics.start_server(port=port)
+            print(f"Metrics available at http://127.0.0.1:{port}/metrics")
+
+        # Syncing here instead of on_ready avoids a sync on every reconnect;
+        # with several workers only the first one touches the global command tree
+        if self.worker_index == 0:
+            await self.sync_commands()
+
+    def command_tree_hash(self):
+        commands_data = []
+        for command in self.tree.get_commands():
+            try:
+                commands_data.append(command.to_dict(self.tree))
+            except TypeError:
+                commands_data.append(command.to_dict())
+        payload = json.dumps(sorted(commands_data, key=lambda data: data["name"]), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def sync_commands(self, force=False):
+        # Only push the command tree to Discord when its signature changed since the last sync
+        tree_hash = self.command_tree_hash()
+        if not force and os.path.exists(COMMAND_HASH_FILE):
+            with open(COMMAND_HASH_FILE, 'r') as file:
+                if file.read().strip() == tree_hash:
+                    return False
+
+        try:
+            await self.tree.sync()
+        except discord.HTTPException as e:
+            # Runs during startup, so a transient Discord error must not stop the bot; with the
+            # hash file left as it was, the next start tries again
+            print(f"Failed to sync the command tree: {e}")
+            return False
+        with open(COMMAND_HASH_FILE, 'w') as file:
+            file.write(tree_hash)
+        return True
+
+    async def close(self):
+        await super().close()
+        # Otherwise its thread outlives the loop and reports the shutdown as a stall
+        if self.watchdog:
+            self.watchdog.stop()
+        # After the cogs are unloaded, so their last writes are already queued
+        close_database()
 
     async def on_ready(self):
-        print(f"Logged in as {self.user.name}")
+        print(f"Logged in as {self.user.name} (worker {self.worker_index}, shards {sorted(self.shards)})")
         print(f"Bot ID: {self.user.id}")
         print(f"Discord Version: {discord.__version__}")
         print(f"Python Version: {platform.python_version()}")
-        synced = await self.tree.sync()
 
-client = Client()
-client.run(TOKEN)
+if __name__ == "__main__":
+    client = Client()
+    client.run(TOKEN)
@@ -0,0 +1,66 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import urllib.request
+from dotenv import load_dotenv
+from utils.sharding import split_shards
+
+load_dotenv()
+
+TOKEN = os.getenv('TOKEN')
+API_BASE = os.getenv('DISCORD_API_BASE', "https://discord.com/api/v10")
+# Discord allows one IDENTIFY per 5 seconds unless the bot has a higher max_concurrency
+IDENTIFY_INTERVAL = 5.0
+
+def recommended_shards():
+    request = urllib.request.Request(f"{API_BASE}/gateway/bot", headers={"Authorization": f"Bot {TOKEN}", "User-Agent": "GrassGuyBot"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return data["shards"], data.get("session_start_limit", {}).get("max_concurrency", 1)
+
+def run_worker(worker_index, shard_ids, shard_count, inboxes, start_delay):
+    # Imported here so each process builds its own client and event loop
+    from grassy import Client
+    from utils.sharding import PollBus
+
+    time.sleep(start_delay)
+    client = Client(shard_ids=shard_ids, shard_count=shard_count, worker_index=worker_index, poll_bus=PollBus(worker_index, inboxes))
+    client.run(TOKEN)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run GrassGuyBot with shards spread over several processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--shards", type=int, default=None, help="Total shard count (defaults to Discord's recommendation)")
+    args = parser.parse_args()
+
+    max_concurrency = 1
+    shard_count = args.shards
+    if shard_count is None:
+        shard_count, max_concurrency = recommended_shards()
+
+    ranges = split_shards(shard_count, args.workers)
+    inboxes = [multiprocessing.Queue() for _ in ranges]
+
+    processes = []
+    identified = 0
+    for worker_index, shard_ids in enumerate(ranges):
+        # Stagger workers so their shards don't all IDENTIFY at once
+        start_delay = identified // max_concurrency * IDENTIFY_INTERVAL
+        identified += len(shard_ids)
+
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(worker_index, shard_ids, shard_count, inboxes, start_delay),
+            name=f"grassy-worker-{worker_index}"
+        )
+        process.start()
+        processes.append(process)
+        print(f"Started worker {worker_index} with shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
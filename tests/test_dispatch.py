@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("discord")
+
+from utils.dispatch import ChannelDispatcher
+
+class BucketedChannel:
+    # Like discord.py's route buckets: an exhausted bucket is waited out inside send()
+    def __init__(self, channel_id, limit=5, per=0.5):
+        self.id = channel_id
+        self.limit = limit
+        self.per = per
+        self.sent = []
+
+    async def send(self, content=None):
+        now = time.monotonic()
+        recent = [sent_at for sent_at in self.sent if sent_at > now - self.per]
+        if len(recent) >= self.limit:
+            await asyncio.sleep(recent[0] + self.per - now)
+        self.sent.append(time.monotonic())
+        return content
+
+def test_burst_to_one_channel_does_not_hold_up_the_others():
+    async def run():
+        # Same shape as Discord's 5 per 5 s, ten times faster
+        dispatcher = ChannelDispatcher(max_concurrency=2, channel_burst=5, channel_rate=10.0)
+        busy = [BucketedChannel(i) for i in range(4)]
+        quiet = BucketedChannel(99)
+
+        for channel in busy:
+            for n in range(30):
+                dispatcher.submit(channel, content=n)
+        start = time.monotonic()
+        await dispatcher.submit(quiet, content="hello")
+        quiet_elapsed = time.monotonic() - start
+
+        await dispatcher.join()
+        return quiet_elapsed, busy
+
+    quiet_elapsed, busy = asyncio.run(run())
+    assert quiet_elapsed < 0.2
+    assert all(len(channel.sent) == 30 for channel in busy)
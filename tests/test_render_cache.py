@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("PIL")
+
+from utils import render
+
+def test_disk_cache_reuses_renders_and_stays_under_its_size_bound(tmp_path, monkeypatch):
+    renders = []
+    monkeypatch.setattr(render, "render_gif", lambda text: renders.append(text) or text.encode() * 100)
+    cache_dir = str(tmp_path)
+
+    for i in range(5):
+        render.render_gif_cached(f"key{i}", f"text{i}", cache_dir, max_bytes=1000)
+        # Oldest first, even on filesystems with coarse mtimes
+        os.utime(os.path.join(cache_dir, f"key{i}.gif"), (i, i))
+
+    # 500 bytes per render and a 1000 byte bound: only the two newest are left, and no temp files
+    assert sorted(os.listdir(cache_dir)) == ["key3.gif", "key4.gif"]
+
+    assert render.render_gif_cached("key4", "text4", cache_dir, max_bytes=1000) == b"text4" * 100
+    assert renders == [f"text{i}" for i in range(5)]
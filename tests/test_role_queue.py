@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("discord")
+
+from cogs.addrole import RoleMutationQueue
+
+class Member:
+    def __init__(self, member_id, guild_id):
+        self.id = member_id
+        self.guild = SimpleNamespace(id=guild_id)
+        self.calls = []
+
+    async def add_roles(self, *roles, reason=None):
+        self.calls.append(("add", [role.id for role in roles]))
+
+    async def remove_roles(self, *roles, reason=None):
+        self.calls.append(("remove", [role.id for role in roles]))
+
+def test_changes_that_cancel_out_send_nothing():
+    async def run():
+        queue = RoleMutationQueue(window=0.01)
+        member = Member(1, 5)
+        toggled, repeated = SimpleNamespace(id=10), SimpleNamespace(id=11)
+
+        queue.enqueue(member, toggled, True)
+        queue.enqueue(member, toggled, False)
+        queue.enqueue(member, repeated, True)
+        queue.enqueue(member, repeated, True)
+        await queue.join()
+        return member.calls, queue.stats()
+
+    calls, stats = asyncio.run(run())
+    assert calls == [("add", [11])]
+    assert stats["coalesced"] == 3
@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+discord = pytest.importorskip("discord")
+pytest.importorskip("aiohttp")
+
+from benchmarks.fake_gateway import FakeGateway
+from utils.database import close_database, get_database
+from utils.reaction_roles import ReactionRoleStore
+from utils.sharding import shard_for_guild
+
+# Shard 1 of 2 is the worker under test; shard 0 belongs to some other worker
+OWNED_GUILD = 1 << 22
+OTHER_GUILD = 2 << 22
+
+@pytest.fixture
+def gateway_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("LOOP_WATCHDOG_MS", "0")
+    for name in ("METRICS_ENABLED", "TWITCH_CLIENT_ID", "TWITCH_CLIENT_SECRET", "TWITCH_REFRESH_TOKEN", "TWITCH_EVENTSUB"):
+        monkeypatch.delenv(name, raising=False)
+    # grassy.py rewrites these from the environment on import; restore them afterwards
+    monkeypatch.setattr(discord.http.Route, "BASE", discord.http.Route.BASE)
+    monkeypatch.setattr(discord.gateway.DiscordWebSocket, "DEFAULT_GATEWAY", discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY)
+    yield monkeypatch
+    close_database()
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+def test_worker_only_loads_reaction_roles_for_its_shards(gateway_env):
+    assert shard_for_guild(OWNED_GUILD, 2) == 1 and shard_for_guild(OTHER_GUILD, 2) == 0
+
+    db = get_database()
+    seed = ReactionRoleStore(db=db)
+    seed.add(OWNED_GUILD, 10, "👍", OWNED_GUILD + 1)
+    seed.add(OTHER_GUILD, 20, "👍", OTHER_GUILD + 1)
+    # Imported from reaction_roles.json before guilds were recorded
+    db.write("INSERT INTO reaction_roles (message_id, emoji, role_id) VALUES (?, ?, ?)", (30, "👍", OWNED_GUILD + 2))
+    db.run_sync(lambda: None)
+
+    async def run():
+        fake = FakeGateway([OWNED_GUILD, OTHER_GUILD])
+        gateway_env.setenv("DISCORD_API_BASE", await fake.start())
+        gateway_env.setenv("DISCORD_GATEWAY_URL", fake.gateway_url)
+        grassy = importlib.reload(importlib.import_module("grassy"))
+
+        client = grassy.Client(shard_ids=[1], shard_count=2, worker_index=1)
+        runner = asyncio.create_task(client.start("token"))
+        try:
+            ready = asyncio.create_task(client.wait_until_ready())
+            await asyncio.wait({ready, runner}, timeout=10, return_when=asyncio.FIRST_COMPLETED)
+            if runner.done():
+                runner.result()
+            assert ready.done()
+            assert [guild.id for guild in client.guilds] == [OWNED_GUILD]
+
+            store = client.get_cog("addrole").reaction_roles
+            assert 10 in store and 30 in store
+            assert 20 not in store
+
+            # Events for the other shard's guild never reach this worker
+            assert not await fake.react(OTHER_GUILD, 20, user_id=7)
+
+            assert await fake.react(OWNED_GUILD, 10, user_id=7)
+            await wait_for(lambda: ("PUT", f"/api/v10/guilds/{OWNED_GUILD}/members/7/roles/{OWNED_GUILD + 1}") in fake.calls)
+
+            # The first reaction on a migrated message records its guild
+            assert await fake.react(OWNED_GUILD, 30, user_id=7)
+            await wait_for(lambda: ("PUT", f"/api/v10/guilds/{OWNED_GUILD}/members/7/roles/{OWNED_GUILD + 2}") in fake.calls)
+            await store.db.flush()
+            assert store.db.query("SELECT guild_id FROM reaction_roles WHERE message_id = 30") == [(OWNED_GUILD,)]
+        finally:
+            await client.close()
+            await asyncio.gather(runner, return_exceptions=True)
+            await fake.stop()
+
+    asyncio.run(run())
+
+def test_store_keeps_unclaimed_rows_in_every_worker(gateway_env):
+    db = get_database()
+    db.write("INSERT INTO reaction_roles (message_id, emoji, role_id) VALUES (?, ?, ?)", (30, "👍", 1))
+    ReactionRoleStore(db=db).add(OWNED_GUILD, 10, "👍", 2)
+    db.run_sync(lambda: None)
+
+    other_worker = ReactionRoleStore(owns_guild=lambda guild_id: shard_for_guild(guild_id, 2) == 0, db=db)
+    assert 30 in other_worker and 10 not in other_worker
+
+    other_worker.claim(30, OWNED_GUILD)
+    db.run_sync(lambda: None)
+    other_worker.load()
+    assert 30 not in other_worker
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("discord")
+pytest.importorskip("aiohttp")
+
+from benchmarks.fake_helix import FakeHelix
+from utils.database import close_database
+from utils.scheduler import PollScheduler
+
+class Message:
+    def __init__(self, channel):
+        self.channel = channel
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs["embed"])
+        return self
+
+class Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.messages = []
+
+    async def send(self, content=None, embed=None):
+        message = Message(self)
+        self.messages.append(message)
+        return message
+
+class Guild:
+    def __init__(self, guild_id, channel):
+        self.id = guild_id
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+
+    def get_role(self, role_id):
+        return None
+
+@pytest.fixture
+def live_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("TWITCH_LIVE_ANNOUNCEMENTS", "1")
+    monkeypatch.setenv("TWITCH_LIVE_EDIT_MINUTES", "0")
+    monkeypatch.setenv("TWITCH_CLIENT_ID", "test")
+    monkeypatch.setenv("TWITCH_CLIENT_SECRET", "test")
+    monkeypatch.delenv("TWITCH_EVENTSUB", raising=False)
+    yield
+    close_database()
+
+def test_live_announcements_are_edited_and_marked_offline(live_env):
+    from cogs.streams import StreamsCog
+
+    async def run():
+        fake = FakeHelix(games=1, streams_per_game=3, churn=0, latency=0, jitter=0)
+        base_url = await fake.start()
+        os.environ["TWITCH_HELIX_URL"] = f"{base_url}/helix"
+        os.environ["TWITCH_TOKEN_URL"] = f"{base_url}/oauth2/token"
+
+        channel = Channel(500)
+        guild = Guild(100, channel)
+        client = SimpleNamespace(guilds=[guild], get_guild=lambda guild_id: guild)
+        cog = StreamsCog(client)
+        try:
+            cog.refresh_token_task.cancel()
+            cog.automatic_stream_check.cancel()
+            cog.poll_scheduler = PollScheduler(min_interval=0, active_interval=0, quiet_interval=0)
+            cog.config_store.set_game(guild.id, fake.game_ids[0], None, channel.id)
+
+            async def tick():
+                await cog.run_stream_check()
+                await cog.dispatcher.join()
+
+            # An empty ledger means a first deploy: streams already live are recorded, not announced
+            await tick()
+            assert len(channel.messages) == 0
+
+            game_id = fake.game_ids[0]
+            fake.streams[game_id] = [fake.new_stream(game_id) for _ in range(3)]
+            await tick()
+            assert len(channel.messages) == 3
+            assert len(cog.tracker) == 3
+
+            for stream in fake.streams[fake.game_ids[0]]:
+                stream["viewer_count"] = stream["viewer_count"] * 3 + 100
+            await tick()
+            assert all(len(message.edits) == 1 for message in channel.messages)
+
+            fake.streams[fake.game_ids[0]] = []
+            await tick()
+            await tick()
+            assert len(cog.tracker) == 0
+            assert all(message.edits[-1].title.startswith("[Offline]") for message in channel.messages)
+        finally:
+            await cog.cog_unload()
+            await fake.stop()
+            os.environ.pop("TWITCH_HELIX_URL", None)
+            os.environ.pop("TWITCH_TOKEN_URL", None)
+
+    asyncio.run(run())
+
+def test_each_game_keeps_only_its_top_streams(live_env):
+    from cogs.streams import StreamsCog
+
+    async def run():
+        fake = FakeHelix(games=3, streams_per_game=50, churn=0, latency=0, jitter=0)
+        base_url = await fake.start()
+        os.environ["TWITCH_HELIX_URL"] = f"{base_url}/helix"
+        os.environ["TWITCH_TOKEN_URL"] = f"{base_url}/oauth2/token"
+
+        client = SimpleNamespace(guilds=[], get_guild=lambda guild_id: None)
+        cog = StreamsCog(client)
+        try:
+            cog.refresh_token_task.cancel()
+            cog.automatic_stream_check.cancel()
+            await cog.refresh_twitch_token()
+
+            streams = await cog.check_twitch_streams(fake.game_ids)
+            assert {game_id: len(game_streams) for game_id, game_streams in streams.items()} == {game_id: 20 for game_id in fake.game_ids}
+            assert not cog.incomplete_games
+            # 150 streams, but paging stops as soon as every game has its 20
+            assert fake.requests["/helix/streams"] == 2
+        finally:
+            await cog.cog_unload()
+            await fake.stop()
+            os.environ.pop("TWITCH_HELIX_URL", None)
+            os.environ.pop("TWITCH_TOKEN_URL", None)
+
+    asyncio.run(run())
+
+def test_requery_rounds_stop_when_the_budget_runs_out(live_env):
+    from cogs.streams import StreamsCog
+
+    async def run():
+        # Every game fills all five pages by itself, so each game needs its own round
+        fake = FakeHelix(games=3, streams_per_game=600, churn=0, latency=0, jitter=0, bucket_size=20)
+        base_url = await fake.start()
+        os.environ["TWITCH_HELIX_URL"] = f"{base_url}/helix"
+        os.environ["TWITCH_TOKEN_URL"] = f"{base_url}/oauth2/token"
+
+        client = SimpleNamespace(guilds=[], get_guild=lambda guild_id: None)
+        cog = StreamsCog(client)
+        try:
+            cog.refresh_token_task.cancel()
+            cog.automatic_stream_check.cancel()
+            await cog.refresh_twitch_token()
+            await cog.helix.get("streams", {"game_id": "0"})
+
+            streams = await cog.check_twitch_streams(fake.game_ids)
+            # Two rounds of five pages fit under the reserve; the third game waits for the next tick
+            assert sorted(streams) == fake.game_ids[:2]
+            assert cog.unpolled_games == {fake.game_ids[2]}
+            assert fake.requests["/helix/streams"] == 1 + 10
+        finally:
+            await cog.cog_unload()
+            await fake.stop()
+            os.environ.pop("TWITCH_HELIX_URL", None)
+            os.environ.pop("TWITCH_TOKEN_URL", None)
+
+    asyncio.run(run())
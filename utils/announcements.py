@@ -0,0 +1,110 @@
+import datetime
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+@dataclass
+class TrackedAnnouncement:
+    stream: dict
+    game_name: str
+    profile_image_url: str
+    messages: list = field(default_factory=list)
+    # Values the posted embeds currently show
+    shown_viewers: int = 0
+    shown_title: str = ""
+    shown_game_id: str = ""
+    last_edit: float = 0.0
+    last_seen: datetime.datetime = None
+    dirty: bool = False
+    misses: int = 0
+
+class AnnouncementTracker:
+    # stream_id -> the announcement messages for it, kept current from poll data.
+    # Edits are coalesced: changes only mark an entry dirty, and dirty entries are
+    # edited at most once per edit_interval with whatever the latest data is.
+    def __init__(self, edit_interval=300, viewer_change=0.25, min_viewer_change=10, miss_limit=2, stale_after=3600, maxsize=2000):
+        self.edit_interval = edit_interval
+        self.viewer_change = viewer_change
+        self.min_viewer_change = min_viewer_change
+        self.miss_limit = miss_limit
+        self.stale_after = stale_after
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def __contains__(self, stream_id):
+        return stream_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def track(self, stream, game_name, profile_image_url):
+        entry = TrackedAnnouncement(
+            stream=stream,
+            game_name=game_name,
+            profile_image_url=profile_image_url,
+            shown_viewers=stream['viewer_count'],
+            shown_title=stream['title'],
+            shown_game_id=stream['game_id'],
+            last_edit=time.monotonic(),
+            last_seen=datetime.datetime.now(datetime.timezone.utc)
+        )
+        self.entries[stream['id']] = entry
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+
+    def add_message(self, stream_id, message):
+        entry = self.entries.get(stream_id)
+        if entry is not None:
+            entry.messages.append(message)
+
+    def forget_message(self, stream_id, message):
+        entry = self.entries.get(stream_id)
+        if entry is not None and message in entry.messages:
+            entry.messages.remove(message)
+
+    def significant(self, entry, stream):
+        if stream['title'] != entry.shown_title or stream['game_id'] != entry.shown_game_id:
+            return True
+        change = abs(stream['viewer_count'] - entry.shown_viewers)
+        return change >= self.min_viewer_change and change >= entry.shown_viewers * self.viewer_change
+
+    def seen(self, stream):
+        entry = self.entries.get(stream['id'])
+        if entry is None:
+            return
+        entry.stream = stream
+        entry.misses = 0
+        entry.last_seen = datetime.datetime.now(datetime.timezone.utc)
+        if self.significant(entry, stream):
+            entry.dirty = True
+
+    def due_edits(self):
+        now = time.monotonic()
+        due = []
+        for entry in self.entries.values():
+            if entry.dirty and entry.messages and now - entry.last_edit >= self.edit_interval:
+                entry.dirty = False
+                entry.last_edit = now
+                entry.shown_viewers = entry.stream['viewer_count']
+                entry.shown_title = entry.stream['title']
+                entry.shown_game_id = entry.stream['game_id']
+                due.append(entry)
+        return due
+
+    def ended(self, polled_game_ids, seen_ids):
+        # A stream has ended once complete polls of its game miss it miss_limit times in a row;
+        # entries nobody has polled for stale_after seconds are dropped without an edit
+        ended = []
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.stale_after)
+        for stream_id, entry in list(self.entries.items()):
+            if entry.last_seen < cutoff:
+                del self.entries[stream_id]
+                continue
+            if stream_id in seen_ids or entry.stream['game_id'] not in polled_game_ids:
+                continue
+            entry.misses += 1
+            if entry.misses >= self.miss_limit:
+                del self.entries[stream_id]
+                ended.append(entry)
+        return ended
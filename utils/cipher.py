@@ -0,0 +1,73 @@
+import re
+
+MESSAGE_LIMIT = 2000
+EMOTE_PREFIX = "MachineCipher"
+
+CIPHER_MAP = {chr(i): f":{EMOTE_PREFIX}{chr(i).upper()}:" for i in range(97, 123)}
+REVERSE_CIPHER_MAP = {v: k for k, v in CIPHER_MAP.items()}
+MAX_TOKEN_LENGTH = max(len(token) for token in CIPHER_MAP.values())
+
+class EncodeTable(dict):
+    # str.translate falls back to __missing__, so anything that isn't a letter becomes a space
+    def __missing__(self, key):
+        return ' '
+
+ENCODE_TABLE = EncodeTable({ord(char): token for char, token in CIPHER_MAP.items()})
+ENCODE_TABLE.update({ord(char.upper()): token for char, token in CIPHER_MAP.items()})
+
+CIPHER_EMOTE_PATTERN = re.compile(r'<a?:' + EMOTE_PREFIX + r'([A-Z]):\d+>')
+EMOTE_PATTERN = re.compile(r'<a?:\w+:(\d+)>')
+EMOTE_NAME_PATTERN = re.compile(EMOTE_PREFIX + r'([A-Z])')
+LETTERS = {chr(i).upper(): chr(i) for i in range(97, 123)}
+
+def emoji_letters(emojis):
+    # emoji ID -> letter, for guild emoji named MachineCipherA..Z
+    letters = {}
+    for emoji in emojis:
+        match = EMOTE_NAME_PATTERN.fullmatch(emoji.name)
+        if match:
+            letters[emoji.id] = match.group(1).lower()
+    return letters
+
+def to_plain_text(cipher_message, letters=None):
+    # str.split() both strips and collapses whitespace runs; emotes never contain whitespace
+    text = ' '.join(cipher_message.split())
+
+    # Splitting on the cipher emotes leaves [text, letter, text, letter, ...]
+    parts = CIPHER_EMOTE_PATTERN.split(text)
+    parts[1::2] = [LETTERS[letter] for letter in parts[1::2]]
+    text = ''.join(parts)
+
+    # Guild emoji that were renamed are still recognised by ID
+    if letters and '<' in text:
+        text = EMOTE_PATTERN.sub(lambda match: letters.get(int(match.group(1)), match.group(0)), text)
+    return text
+
+def to_machine_cipher(plain_text):
+    return plain_text.translate(ENCODE_TABLE)
+
+def iter_machine_cipher(plain_text, limit=MESSAGE_LIMIT):
+    # Encode in blocks small enough that no block can overflow a message, then pack
+    # blocks greedily, so tokens are never split and the full output is never built.
+    block_size = max(1, limit // MAX_TOKEN_LENGTH)
+    chunk = ""
+    for i in range(0, len(plain_text), block_size):
+        block = plain_text[i:i + block_size].translate(ENCODE_TABLE)
+        if len(chunk) + len(block) > limit:
+            yield chunk
+            chunk = ""
+        chunk += block
+    if chunk:
+        yield chunk
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind(' ', 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip(' ')
+    if text:
+        chunks.append(text)
+    return chunks
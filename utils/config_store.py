@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from utils.database import get_database
+
+@dataclass
+class GameSetting:
+    role_id: int = None
+    stream_channel_id: int = None
+
+@dataclass
+class GuildStreamConfig:
+    notifications_active: bool = True
+    games: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        config = cls(notifications_active=data.get('notifications_active', True))
+        for game_id, settings in data.items():
+            if isinstance(settings, dict):
+                config.games[game_id] = GameSetting(settings.get('role_id'), settings.get('stream_channel_id'))
+        return config
+
+    def to_dict(self):
+        data = {'notifications_active': self.notifications_active}
+        for game_id, settings in self.games.items():
+            data[game_id] = {'role_id': settings.role_id, 'stream_channel_id': settings.stream_channel_id}
+        return data
+
+def migrate_stream_config(connection, data):
+    # stream_config.json: {guild_id: {"notifications_active": bool, game_id: {"role_id", "stream_channel_id"}}}
+    for guild_id, guild_data in data.items():
+        config = GuildStreamConfig.from_dict(guild_data)
+        connection.execute(
+            "INSERT OR REPLACE INTO stream_guilds (guild_id, notifications_active) VALUES (?, ?)",
+            (int(guild_id), config.notifications_active)
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO stream_games (guild_id, game_id, role_id, stream_channel_id) VALUES (?, ?, ?, ?)",
+            [(int(guild_id), game_id, settings.role_id, settings.stream_channel_id) for game_id, settings in config.games.items()]
+        )
+
+class StreamConfigStore:
+    def __init__(self, json_path="stream_config.json", owns_guild=None, db=None):
+        self.db = db or get_database()
+        self.db.migrate_json("stream_config", json_path, migrate_stream_config)
+        # When sharded across processes, only guilds on this process's shards are kept
+        self.owns_guild = owns_guild or (lambda guild_id: True)
+        self.guilds = {}
+        self.load()
+
+    def load(self):
+        self.guilds = {}
+        for guild_id, notifications_active in self.db.query("SELECT guild_id, notifications_active FROM stream_guilds"):
+            if self.owns_guild(guild_id):
+                self.guilds[guild_id] = GuildStreamConfig(notifications_active=bool(notifications_active))
+        for guild_id, game_id, role_id, stream_channel_id in self.db.query(
+            "SELECT guild_id, game_id, role_id, stream_channel_id FROM stream_games"
+        ):
+            config = self.guilds.get(guild_id)
+            if config is not None:
+                config.games[game_id] = GameSetting(role_id, stream_channel_id)
+
+    def get(self, guild_id):
+        return self.guilds.get(guild_id)
+
+    def items(self):
+        return self.guilds.items()
+
+    def ensure(self, guild_id):
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = GuildStreamConfig()
+        return self.guilds[guild_id]
+
+    def write_guild(self, guild_id):
+        self.db.write(
+            "INSERT OR REPLACE INTO stream_guilds (guild_id, notifications_active) VALUES (?, ?)",
+            (guild_id, self.guilds[guild_id].notifications_active)
+        )
+
+    def set_game(self, guild_id, game_id, role_id, stream_channel_id):
+        if guild_id not in self.guilds:
+            self.ensure(guild_id)
+            self.write_guild(guild_id)
+        config = self.guilds[guild_id]
+        config.games[game_id] = GameSetting(role_id, stream_channel_id)
+        self.db.write(
+            "INSERT OR REPLACE INTO stream_games (guild_id, game_id, role_id, stream_channel_id) VALUES (?, ?, ?, ?)",
+            (guild_id, game_id, role_id, stream_channel_id)
+        )
+
+    def set_notifications(self, guild_id, notifications_active):
+        self.ensure(guild_id).notifications_active = notifications_active
+        self.write_guild(guild_id)
+
+    def remove_game(self, guild_id, game_id):
+        config = self.guilds.get(guild_id)
+        if config is None or game_id not in config.games:
+            return False
+        del config.games[game_id]
+        self.db.write("DELETE FROM stream_games WHERE guild_id = ? AND game_id = ?", (guild_id, game_id))
+        return True
+
+    async def close(self):
+        await self.db.flush()
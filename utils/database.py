@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    migrated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reaction_roles (
+    message_id INTEGER NOT NULL,
+    emoji TEXT NOT NULL,
+    role_id INTEGER NOT NULL,
+    guild_id INTEGER,
+    PRIMARY KEY (message_id, emoji)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stream_guilds (
+    guild_id INTEGER PRIMARY KEY,
+    notifications_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS stream_games (
+    guild_id INTEGER NOT NULL,
+    game_id TEXT NOT NULL,
+    role_id INTEGER,
+    stream_channel_id INTEGER,
+    PRIMARY KEY (guild_id, game_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stream_games_game_id ON stream_games (game_id);
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    twitter_provider TEXT
+);
+CREATE TABLE IF NOT EXISTS sent_streams (
+    worker INTEGER NOT NULL,
+    stream_id TEXT NOT NULL,
+    announced_at REAL NOT NULL,
+    PRIMARY KEY (worker, stream_id)
+) WITHOUT ROWID;
+"""
+
+class Database:
+    # One SQLite connection owned by a single worker thread. Writes are queued to that
+    # thread in order and return immediately, so the event loop never waits on disk;
+    # WAL mode lets the other bot processes read and write the same file concurrently.
+    def __init__(self, path):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+        self.connection = None
+        self.errors = 0
+        self.run_sync(self.connect)
+
+    def connect(self):
+        # isolation_level=None: every statement commits on its own unless wrapped in transaction()
+        self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.upgrade()
+
+    def upgrade(self):
+        # Columns added after a table first shipped; CREATE TABLE IF NOT EXISTS leaves old tables as they were
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(reaction_roles)")}
+        if "guild_id" not in columns:
+            self.connection.execute("ALTER TABLE reaction_roles ADD COLUMN guild_id INTEGER")
+
+    def run_sync(self, func, *args):
+        # Blocking; only for startup, before the cogs start serving events
+        return self.executor.submit(func, *args).result()
+
+    async def run(self, func, *args):
+        return await asyncio.wrap_future(self.executor.submit(func, *args))
+
+    def query(self, sql, params=()):
+        return self.run_sync(lambda: self.connection.execute(sql, params).fetchall())
+
+    async def fetch(self, sql, params=()):
+        return await self.run(lambda: self.connection.execute(sql, params).fetchall())
+
+    def write(self, sql, params=()):
+        future = self.executor.submit(self.connection.execute, sql, params)
+        future.add_done_callback(self.log_error)
+        return future
+
+    def write_many(self, sql, rows):
+        future = self.executor.submit(self.connection.executemany, sql, list(rows))
+        future.add_done_callback(self.log_error)
+        return future
+
+    def log_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.errors += 1
+            print(f"Database write failed: {future.exception()}")
+
+    def transaction(self, func):
+        # BEGIN IMMEDIATE takes the write lock up front, so checks inside func can't race other processes
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(self.connection)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return result
+
+    async def flush(self):
+        # Waits for every write queued so far
+        await self.run(lambda: None)
+
+    def migrate_json(self, name, path, apply):
+        # Imports a legacy JSON file once per database; apply(connection, data) inserts its rows
+        def migrate(connection):
+            if connection.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return False
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r') as file:
+                        apply(connection, json.load(file))
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"Could not migrate {path}: {e}")
+            connection.execute("INSERT INTO migrations (name, migrated_at) VALUES (?, ?)", (name, time.time()))
+            return True
+
+        # The JSON file is left in place; the migrations row keeps it from being imported twice
+        if self.run_sync(self.transaction, migrate) and os.path.exists(path):
+            print(f"Migrated {path} into {self.path}")
+
+    def close(self):
+        self.executor.submit(self.connection.close)
+        self.executor.shutdown(wait=True)
+
+database = None
+
+def get_database():
+    # One database per process, shared by every cog and kept across cog reloads
+    global database
+    if database is None:
+        database = Database(os.getenv('DATABASE_PATH') or "grassy.db")
+    return database
+
+def close_database():
+    global database
+    if database is not None:
+        database.close()
+        database = None
@@ -0,0 +1,105 @@
+import asyncio
+from collections import deque
+import discord
+from utils.cache import TTLCache
+from utils.ratelimit import TokenBucket
+
+class ChannelDispatcher:
+    # Sends messages to many channels at once, at most `max_concurrency` in flight.
+    # Each channel gets its own FIFO worker, so messages to one channel keep their order.
+    # discord.py waits out an exhausted route bucket inside the request itself, so a
+    # burst to one channel would hold its concurrency slot for the whole wait. Each
+    # channel is therefore paced by its own token bucket (Discord allows about 5
+    # messages per 5 s per channel) before it takes a slot.
+    def __init__(self, max_concurrency=10, max_retries=3, channel_burst=5, channel_rate=1.0):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.channel_burst = channel_burst
+        self.channel_rate = channel_rate
+        # Kept past the worker's lifetime, so a new burst doesn't start with a full bucket
+        self.buckets = TTLCache(maxsize=10000, ttl=60)
+        # channel_id -> deque of (channel, call, kwargs, future)
+        self.queues = {}
+        self.workers = {}
+        self.stats = {"sent": 0, "rate_limited": 0, "failed": 0}
+
+    def submit(self, channel, **kwargs):
+        # Returns a future for the sent message (None if it could not be delivered)
+        return self.enqueue(channel, channel.send, kwargs)
+
+    def submit_edit(self, message, **kwargs):
+        # Queued behind sends to the same channel, so an edit never overtakes its message
+        return self.enqueue(message.channel, message.edit, kwargs)
+
+    def enqueue(self, channel, call, kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(channel.id, deque()).append((channel, call, kwargs, future))
+        if channel.id not in self.workers:
+            self.workers[channel.id] = asyncio.create_task(self.drain(channel.id))
+        return future
+
+    async def drain(self, channel_id):
+        queue = self.queues[channel_id]
+        future = None
+        try:
+            while queue:
+                channel, call, kwargs, future = queue.popleft()
+                message = await self.deliver(channel, call, kwargs)
+                if not future.done():
+                    future.set_result(message)
+        finally:
+            # Cancelled with work left: don't leave callers waiting forever
+            if future is not None and not future.done():
+                future.cancel()
+            for *_, pending in self.queues.pop(channel_id):
+                pending.cancel()
+            del self.workers[channel_id]
+
+    async def pace(self, channel_id):
+        # Sends and edits share the channel's bucket; waiting here holds no slot
+        bucket = self.buckets.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(capacity=self.channel_burst, refill_rate=self.channel_rate)
+        self.buckets.set(channel_id, bucket)
+        while not bucket.consume():
+            await asyncio.sleep(bucket.delay())
+
+    async def deliver(self, channel, call, kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.pace(channel.id)
+            try:
+                async with self.semaphore:
+                    message = await call(**kwargs)
+                self.stats["sent"] += 1
+                return message
+            except discord.RateLimited as e:
+                # Raised instead of sleeping when the wait exceeds the client's max_ratelimit_timeout
+                retry_after = e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429:
+                    self.stats["failed"] += 1
+                    print(f"Error sending to channel {channel.id}: {e}")
+                    return None
+                retry_after = 2 ** attempt
+
+            # A 429 that got past the pacing (shared limits, other processes): back off
+            # outside the semaphore so other channels keep sending
+            self.stats["rate_limited"] += 1
+            await asyncio.sleep(retry_after)
+
+        self.stats["failed"] += 1
+        print(f"Giving up on channel {channel.id} after {self.max_retries} rate-limited retries")
+        return None
+
+    async def join(self):
+        while self.workers:
+            await asyncio.gather(*self.workers.values(), return_exceptions=True)
+
+    async def close(self):
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def depth(self):
+        return sum(len(queue) for queue in self.queues.values())
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import traceback
+import aiohttp
+from utils.twitch import HELIX_URL
+
+EVENTSUB_WS_URL = "wss://eventsub.wss.twitch.tv/ws"
+EVENTSUB_SUBSCRIPTIONS_URL = f"{HELIX_URL}/eventsub/subscriptions"
+
+class EventSubClient:
+    # stream.online only takes a broadcaster condition, so we subscribe per
+    # broadcaster and let polling discover new ones. A WebSocket session is
+    # capped at 300 enabled subscriptions.
+    def __init__(self, helix, on_stream_online, ws_url=None, subscriptions_url=None, max_subscriptions=300):
+        self.helix = helix
+        self.on_stream_online = on_stream_online
+        self.ws_url = ws_url or EVENTSUB_WS_URL
+        self.subscriptions_url = subscriptions_url or EVENTSUB_SUBSCRIPTIONS_URL
+        self.max_subscriptions = max_subscriptions
+
+        self.session_id = None
+        self.connected = False
+        self.broadcasters = set()
+        self.subscribed = set()
+        self.seen_messages = set()
+        # Strong references to subscribe/notification tasks, so none is garbage-collected mid-flight
+        self.tasks = set()
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.task_done)
+
+    def task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            traceback.print_exception(task.exception())
+
+    def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+    def track(self, broadcaster_ids):
+        for broadcaster_id in broadcaster_ids:
+            if broadcaster_id in self.broadcasters or len(self.broadcasters) >= self.max_subscriptions:
+                continue
+            self.broadcasters.add(broadcaster_id)
+            if self.session_id:
+                self.spawn(self.subscribe(broadcaster_id))
+
+    async def subscribe(self, broadcaster_id):
+        if broadcaster_id in self.subscribed:
+            return
+        self.subscribed.add(broadcaster_id)
+        body = {
+            "type": "stream.online",
+            "version": "1",
+            "condition": {"broadcaster_user_id": broadcaster_id},
+            "transport": {"method": "websocket", "session_id": self.session_id}
+        }
+        status, data = await self.helix.post(self.subscriptions_url, body)
+        if status not in (200, 202, 409):
+            self.subscribed.discard(broadcaster_id)
+            print(f"Error creating EventSub subscription: {status} - {data}")
+
+    async def run(self):
+        url = self.ws_url
+        delay = 1
+        while True:
+            try:
+                url = await self.listen(url)
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"EventSub connection lost: {e}")
+                url = self.ws_url
+            self.connected = False
+
+            if url == self.ws_url:
+                # A fresh session starts with no subscriptions
+                self.session_id = None
+                self.subscribed.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def listen(self, url):
+        keepalive = 10
+        async with self.helix.get_session().ws_connect(url) as ws:
+            while True:
+                msg = await ws.receive(timeout=keepalive + 10)
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    return self.ws_url
+
+                message = json.loads(msg.data)
+                metadata = message.get("metadata", {})
+                payload = message.get("payload", {})
+                message_type = metadata.get("message_type")
+
+                # Twitch may redeliver a message, drop anything we have already handled
+                message_id = metadata.get("message_id")
+                if message_id in self.seen_messages:
+                    continue
+                self.seen_messages.add(message_id)
+                if len(self.seen_messages) > 1000:
+                    self.seen_messages.clear()
+
+                if message_type == "session_welcome":
+                    session = payload["session"]
+                    keepalive = session.get("keepalive_timeout_seconds") or keepalive
+                    resubscribe = self.session_id != session["id"] and not self.subscribed
+                    self.session_id = session["id"]
+                    self.connected = True
+                    if resubscribe:
+                        for broadcaster_id in list(self.broadcasters):
+                            self.spawn(self.subscribe(broadcaster_id))
+                elif message_type == "session_reconnect":
+                    # Subscriptions carry over to the reconnect URL
+                    return payload["session"]["reconnect_url"]
+                elif message_type == "revocation":
+                    broadcaster_id = payload["subscription"]["condition"].get("broadcaster_user_id")
+                    self.subscribed.discard(broadcaster_id)
+                    self.broadcasters.discard(broadcaster_id)
+                elif message_type == "notification":
+                    if payload["subscription"]["type"] == "stream.online":
+                        self.spawn(self.on_stream_online(payload["event"]))
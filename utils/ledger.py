@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from utils.database import get_database
+
+class SentStreamLedger:
+    # Streams this worker has announced. Rows are written once per announcement and
+    # deleted on expiry; the per-tick "still live" touches only live in memory.
+    def __init__(self, worker=0, json_path=None, grace_period=600, maxsize=10000, db=None):
+        self.db = db or get_database()
+        self.worker = worker
+        self.grace_period = grace_period
+        self.maxsize = maxsize
+        if json_path:
+            self.db.migrate_json(f"sent_streams.{worker}", json_path, self.migrate)
+        # stream_id -> last time the stream was seen live, oldest first
+        self.entries = OrderedDict()
+        self.load()
+
+    def migrate(self, connection, stream_ids):
+        now = time.time()
+        connection.executemany(
+            "INSERT OR REPLACE INTO sent_streams (worker, stream_id, announced_at) VALUES (?, ?, ?)",
+            [(self.worker, stream_id, now) for stream_id in stream_ids[-self.maxsize:]]
+        )
+
+    def load(self):
+        rows = self.db.query(
+            "SELECT stream_id FROM sent_streams WHERE worker = ? ORDER BY announced_at DESC LIMIT ?",
+            (self.worker, self.maxsize)
+        )
+        # Streams from the last run get a fresh grace period to show up again
+        now = time.monotonic()
+        for (stream_id,) in reversed(rows):
+            self.entries[stream_id] = now
+
+    def __contains__(self, stream_id):
+        return stream_id in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, stream_id):
+        self.add_many([stream_id])
+
+    def add_many(self, stream_ids):
+        stream_ids = list(stream_ids)
+        now = time.monotonic()
+        for stream_id in stream_ids:
+            self.entries[stream_id] = now
+            self.entries.move_to_end(stream_id)
+        self.db.write_many(
+            "INSERT OR REPLACE INTO sent_streams (worker, stream_id, announced_at) VALUES (?, ?, ?)",
+            [(self.worker, stream_id, time.time()) for stream_id in stream_ids]
+        )
+        evicted = []
+        while len(self.entries) > self.maxsize:
+            evicted.append(self.entries.popitem(last=False)[0])
+        self.delete(evicted)
+
+    def touch(self, stream_ids):
+        now = time.monotonic()
+        for stream_id in stream_ids:
+            if stream_id in self.entries:
+                self.entries[stream_id] = now
+                self.entries.move_to_end(stream_id)
+
+    def expire(self):
+        cutoff = time.monotonic() - self.grace_period
+        expired = []
+        for stream_id, last_seen in self.entries.items():
+            if last_seen > cutoff:
+                break
+            expired.append(stream_id)
+
+        for stream_id in expired:
+            del self.entries[stream_id]
+        self.delete(expired)
+        return expired
+
+    def delete(self, stream_ids):
+        if stream_ids:
+            self.db.write_many(
+                "DELETE FROM sent_streams WHERE worker = ? AND stream_id = ?",
+                [(self.worker, stream_id) for stream_id in stream_ids]
+            )
+
+    async def close(self):
+        await self.db.flush()
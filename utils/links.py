@@ -0,0 +1,25 @@
+import re
+
+PROVIDERS = {
+    "fxtwitter": "fxtwitter.com",
+    "fixupx": "fixupx.com",
+    "vxtwitter": "vxtwitter.com",
+    "fixvx": "fixvx.com"
+}
+DEFAULT_PROVIDER = "fxtwitter"
+
+TWITTER_LINK_REGEX = re.compile(r'https://(?:www\.|mobile\.)?(?:twitter|x)\.com/(\w+)/status/(\d+)')
+
+def might_contain_twitter_link(content):
+    # Substring checks are far cheaper than the regex and reject almost every message
+    return "/status/" in content and ("twitter.com" in content or "x.com" in content)
+
+def find_twitter_links(content):
+    return TWITTER_LINK_REGEX.findall(content)
+
+def provider_link(user, status_id, provider=DEFAULT_PROVIDER):
+    host = PROVIDERS.get(provider, PROVIDERS[DEFAULT_PROVIDER])
+    return f"https://{host}/{user}/status/{status_id}"
+
+def rewrite_twitter_links(content, provider=DEFAULT_PROVIDER):
+    return [provider_link(user, status_id, provider) for user, status_id in find_twitter_links(content)]
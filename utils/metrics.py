@@ -0,0 +1,166 @@
+import functools
+import os
+import time
+from bisect import bisect_left
+
+# Off unless METRICS_ENABLED is set; when off, timed() returns the handler untouched
+# and every other call returns before doing any work.
+ENABLED = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+counters = {}
+gauges = {}
+histograms = {}
+collectors = []
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+def key(name, labels):
+    return (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        k = key(name, labels)
+        counters[k] = counters.get(k, 0) + value
+
+def set_gauge(name, value, **labels):
+    if ENABLED:
+        gauges[key(name, labels)] = value
+
+def observe(name, value, **labels):
+    if ENABLED:
+        k = key(name, labels)
+        histogram = histograms.get(k)
+        if histogram is None:
+            histogram = histograms[k] = Histogram()
+        histogram.observe(value)
+
+class Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+NULL_TIMER = NullTimer()
+
+def timer(name, **labels):
+    return Timer(name, labels) if ENABLED else NULL_TIMER
+
+def timed(name, **labels):
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def register_collector(func):
+    # func() -> [(name, labels_dict, value), ...], read at export time for values owned elsewhere (cache stats etc.)
+    if ENABLED:
+        collectors.append(func)
+    return func
+
+def unregister_collector(func):
+    if func in collectors:
+        collectors.remove(func)
+
+def format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+def collected_gauges():
+    values = dict(gauges)
+    for collector in list(collectors):
+        for name, labels, value in collector():
+            values[key(name, labels)] = value
+    return values
+
+def render_prometheus():
+    lines = []
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), value in sorted(collected_gauges().items()):
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else bound
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+def render_summary():
+    lines = []
+    for (name, labels), histogram in sorted(histograms.items()):
+        lines.append(
+            f"{name}{format_labels(labels)}: n={histogram.count} "
+            f"avg={histogram.sum / histogram.count * 1000 if histogram.count else 0:.1f}ms "
+            f"p50<={histogram.quantile(0.5) * 1000:g}ms p99<={histogram.quantile(0.99) * 1000:g}ms"
+        )
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"{name}{format_labels(labels)}: {value}")
+    for (name, labels), value in sorted(collected_gauges().items()):
+        lines.append(f"{name}{format_labels(labels)}: {value:g}" if isinstance(value, float) else f"{name}{format_labels(labels)}: {value}")
+    return "\n".join(lines)
+
+async def start_server(host="127.0.0.1", port=9108):
+    # Imported lazily; aiohttp ships with discord.py
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
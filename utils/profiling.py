@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from utils import metrics
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+def blame(frame):
+    # Innermost frame that belongs to a cog, e.g. "cogs.streams.handle_streams"
+    while frame is not None:
+        name = frame.f_globals.get('__name__', '')
+        if name.startswith("cogs."):
+            return name, frame.f_code.co_name
+        frame = frame.f_back
+    return None, None
+
+class LoopWatchdog:
+    # A heartbeat task on the loop plus a thread watching it. When the heartbeat stops
+    # for longer than `threshold`, the thread grabs the loop thread's stack while the
+    # blocking call is still running and names the cog function it came from.
+    def __init__(self, threshold=0.25, interval=0.1, history=20):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.last_beat = time.monotonic()
+        self.reported_beat = None
+        self.loop_thread_id = None
+        self.task = None
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.running = True
+        self.task = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+
+    async def heartbeat(self):
+        while True:
+            start = time.monotonic()
+            self.last_beat = start
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            metrics.observe("event_loop_lag_seconds", lag)
+
+    def watch(self):
+        while self.running:
+            time.sleep(self.threshold / 2)
+            beat = self.last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if self.running and stalled > self.threshold and beat != self.reported_beat:
+                self.reported_beat = beat
+                self.report(stalled)
+
+    def report(self, stalled):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        module, function = blame(frame)
+        stack = "".join(traceback.format_stack(frame))
+        self.stalls.append({"time": time.time(), "stalled": stalled, "cog": module, "function": function, "stack": stack})
+        metrics.inc("event_loop_stalls_total", cog=module or "unknown")
+        print(f"Event loop blocked for {stalled * 1000:.0f}+ ms in {module}.{function}:\n{stack}" if module
+              else f"Event loop blocked for {stalled * 1000:.0f}+ ms:\n{stack}")
+
+class SamplingProfiler:
+    # Samples every thread's stack at a fixed interval and counts them in the collapsed
+    # format flamegraph.pl and speedscope read: "thread;outer;...;inner count" per line.
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+
+    def sample(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)).replace(" ", "_").replace(";", "_"))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def run(self, duration):
+        # Blocking; run it in a thread
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+        return self.collapsed()
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+def watchdog_from_env():
+    # LOOP_WATCHDOG_MS=0 turns it off
+    threshold_ms = float(os.getenv('LOOP_WATCHDOG_MS') or 250)
+    if threshold_ms <= 0:
+        return None
+    return LoopWatchdog(threshold=threshold_ms / 1000)
@@ -0,0 +1,87 @@
+import discord
+from utils.database import get_database
+
+def emoji_key(emoji):
+    # Custom emoji are matched by ID (names can change), unicode emoji by the character itself
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return emoji.id or emoji.name
+
+def migrate_reaction_roles(connection, data):
+    # reaction_roles.json: {message_id: {emoji: role_id}}; it never recorded the guild, so
+    # guild_id stays NULL until the first reaction on the message fills it in (see claim)
+    connection.executemany(
+        "INSERT OR REPLACE INTO reaction_roles (message_id, emoji, role_id) VALUES (?, ?, ?)",
+        [(int(message_id), emoji, role_id) for message_id, emojis in data.items() for emoji, role_id in emojis.items()]
+    )
+
+class ReactionRoleStore:
+    def __init__(self, json_path='reaction_roles.json', owns_guild=None, db=None):
+        self.db = db or get_database()
+        self.db.migrate_json("reaction_roles", json_path, migrate_reaction_roles)
+        # When sharded across processes, only messages in this process's guilds are kept
+        self.owns_guild = owns_guild or (lambda guild_id: True)
+        # Migrated messages whose guild is not known yet; every worker keeps those
+        self.unclaimed = set()
+        # {message_id: {emoji: role_id}} as the command was given the emoji
+        self.reaction_roles = {}
+        # Hot-path index: {message_id: {emoji_key: role_id}}
+        self.index = {}
+        self.load()
+
+    def load(self):
+        self.reaction_roles = {}
+        self.unclaimed = set()
+        for message_id, emoji, role_id, guild_id in self.db.query(
+            "SELECT message_id, emoji, role_id, guild_id FROM reaction_roles"
+        ):
+            if guild_id is None:
+                self.unclaimed.add(message_id)
+            elif not self.owns_guild(guild_id):
+                continue
+            self.reaction_roles.setdefault(message_id, {})[emoji] = role_id
+        self.rebuild_index()
+
+    def rebuild_index(self):
+        self.index = {}
+        for message_id, emojis in self.reaction_roles.items():
+            self.index[message_id] = {emoji_key(emoji): role_id for emoji, role_id in emojis.items()}
+
+    def __contains__(self, message_id):
+        return message_id in self.index
+
+    def lookup(self, message_id, emoji):
+        roles = self.index.get(message_id)
+        if roles is None:
+            return None
+        return roles.get(emoji.id or emoji.name)
+
+    def add(self, guild_id, message_id, emoji, role_id):
+        self.reaction_roles.setdefault(message_id, {})[emoji] = role_id
+        self.index.setdefault(message_id, {})[emoji_key(emoji)] = role_id
+        self.db.write(
+            "INSERT OR REPLACE INTO reaction_roles (message_id, emoji, role_id, guild_id) VALUES (?, ?, ?, ?)",
+            (message_id, emoji, role_id, guild_id)
+        )
+        self.claim(message_id, guild_id)
+
+    def claim(self, message_id, guild_id):
+        # Records the guild of a migrated message, so after a restart only its own worker loads it
+        if message_id in self.unclaimed:
+            self.unclaimed.discard(message_id)
+            self.db.write("UPDATE reaction_roles SET guild_id = ? WHERE message_id = ? AND guild_id IS NULL", (guild_id, message_id))
+
+    def remove(self, message_id, emoji):
+        emojis = self.reaction_roles.get(message_id)
+        if not emojis or emoji not in emojis:
+            return False
+        del emojis[emoji]
+        del self.index[message_id][emoji_key(emoji)]
+        if not emojis:
+            del self.reaction_roles[message_id]
+            del self.index[message_id]
+        self.db.write("DELETE FROM reaction_roles WHERE message_id = ? AND emoji = ?", (message_id, emoji))
+        return True
+
+    async def close(self):
+        await self.db.flush()
@@ -0,0 +1,183 @@
+import hashlib
+import io
+import os
+import tempfile
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+WIDTH, HEIGHT = 800, 200
+NUM_FRAMES = 30
+INITIAL_FONT_SIZE = 40
+FONT_PATH = "arial.ttf"
+MARGIN = 20
+# Bump when the output changes so cached renders are not reused
+RENDER_VERSION = 2
+
+def get_text_size(draw, text, font):
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    return text_width, text_height
+
+@lru_cache(maxsize=64)
+def load_font(font_size):
+    return ImageFont.truetype(FONT_PATH, font_size)
+
+def wrap_text(words, font, max_width):
+    # Each word is measured once; line width is accumulated instead of re-measuring the growing line
+    space_width = font.getlength(" ")
+    lines = []
+    current_line = []
+    current_width = 0
+
+    for word in words:
+        word_width = font.getlength(word)
+        test_width = current_width + space_width + word_width if current_line else word_width
+
+        if test_width <= max_width or not current_line:
+            current_line.append(word)
+            current_width = test_width
+        else:
+            lines.append(" ".join(current_line))
+            current_line = [word]
+            current_width = word_width
+
+    if current_line:
+        lines.append(" ".join(current_line))
+
+    return lines
+
+def layout_text(draw, words, font_size):
+    font = load_font(font_size)
+    wrapped_text = wrap_text(words, font, WIDTH - MARGIN)
+    sizes = [get_text_size(draw, line, font) for line in wrapped_text]
+    total_text_height = sum(height for _, height in sizes)
+    return font, wrapped_text, sizes, total_text_height
+
+def fit_text(text):
+    # Largest font size whose wrapped text fits the frame. Most texts are short and fit at
+    # the initial size, so that is tried first; only longer ones pay for the binary search.
+    draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+    words = text.split()
+
+    layout = layout_text(draw, words, INITIAL_FONT_SIZE)
+    if layout[3] <= HEIGHT - MARGIN:
+        return layout
+
+    low, high = 1, INITIAL_FONT_SIZE - 1
+    best = None
+    while low <= high:
+        font_size = (low + high) // 2
+        layout = layout_text(draw, words, font_size)
+        if layout[3] <= HEIGHT - MARGIN:
+            best = layout
+            low = font_size + 1
+        else:
+            high = font_size - 1
+
+    return best or layout_text(draw, words, 1)
+
+@lru_cache(maxsize=1)
+def gradient_background():
+    # Red-to-blue vertical gradient, built once as a single column and stretched
+    column = Image.new('RGB', (1, HEIGHT))
+    column.putdata([(int(255 * (y / HEIGHT)), 0, int(255 * (1 - (y / HEIGHT)))) for y in range(HEIGHT)])
+    return column.resize((WIDTH, HEIGHT), Image.NEAREST)
+
+def text_mask(text):
+    font, wrapped_text, sizes, total_text_height = fit_text(text)
+    mask = Image.new('L', (WIDTH, HEIGHT), 0)
+    draw = ImageDraw.Draw(mask)
+
+    current_y = (HEIGHT - total_text_height) // 2
+    for line, (text_width, text_height) in zip(wrapped_text, sizes):
+        draw.text(((WIDTH - text_width) // 2, current_y), line, font=font, fill=255)
+        current_y += text_height
+    return mask
+
+def frame_color(i):
+    shift = 255 * i // NUM_FRAMES
+    return (shift % 255, (shift * 2) % 255, (shift * 3) % 255)
+
+def shared_palette(frames):
+    # One adaptive palette for the whole animation, sampled from every frame at half size
+    sample_width, sample_height = WIDTH // 2, HEIGHT // 2
+    sample = Image.new('RGB', (sample_width, sample_height * len(frames)))
+    for i, frame in enumerate(frames):
+        sample.paste(frame.resize((sample_width, sample_height), Image.NEAREST), (0, i * sample_height))
+    return sample.quantize(colors=256, method=Image.MEDIANCUT)
+
+def render_gif(text):
+    # The background and text layout never change between frames, only the text colour does
+    background = gradient_background()
+    mask = text_mask(text)
+
+    frames = []
+    for i in range(NUM_FRAMES):
+        frame = background.copy()
+        frame.paste(frame_color(i), (0, 0), mask)
+        frames.append(frame)
+
+    # With a shared palette and no dithering only the text pixels differ between frames,
+    # so the GIF writer can encode each frame as the delta box around the text.
+    palette = shared_palette(frames)
+    frames = [frame.quantize(palette=palette, dither=Image.NONE) for frame in frames]
+
+    image_bytes = io.BytesIO()
+    frames[0].save(image_bytes, format='GIF', save_all=True, append_images=frames[1:], duration=100, loop=0, optimize=True, disposal=1)
+    return image_bytes.getvalue()
+
+def render_key(text):
+    params = (text, WIDTH, HEIGHT, NUM_FRAMES, INITIAL_FONT_SIZE, FONT_PATH, RENDER_VERSION)
+    return hashlib.sha256(repr(params).encode()).hexdigest()
+
+def render_gif_cached(key, text, cache_dir=None, max_bytes=256 * 1024 * 1024):
+    # Disk tier, run inside the render executor so file I/O stays off the event loop
+    path = os.path.join(cache_dir, key + ".gif") if cache_dir else None
+    if path:
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            # Reads refresh the mtime, so pruning drops the least recently used renders
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            pass
+
+    data = render_gif(text)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # A unique temp name, so two renders of the same text (threads or processes) never share one
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-", suffix=".gif")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        prune_cache(cache_dir, max_bytes)
+    return data
+
+def prune_cache(cache_dir, max_bytes):
+    # Deletes the oldest renders until the directory fits in max_bytes
+    entries = []
+    with os.scandir(cache_dir) as scan:
+        for entry in scan:
+            if entry.name.endswith(".gif") and not entry.name.startswith(".tmp-"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+        total -= size
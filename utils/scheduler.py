@@ -0,0 +1,42 @@
+import time
+import zlib
+
+class PollScheduler:
+    def __init__(self, min_interval=2.0, active_interval=10.0, quiet_interval=60.0, backoff=1.5):
+        self.min_interval = min_interval
+        self.active_interval = active_interval
+        self.quiet_interval = quiet_interval
+        self.backoff = backoff
+        # game_id -> [next_due, interval]
+        self.games = {}
+
+    def sync(self, game_ids):
+        now = time.monotonic()
+        for game_id in game_ids:
+            if game_id not in self.games:
+                # Stagger first polls across the minimum interval so new games don't all land on one tick
+                offset = (zlib.crc32(str(game_id).encode()) % 1000) / 1000 * self.min_interval
+                self.games[game_id] = [now + offset, self.min_interval]
+
+        for game_id in set(self.games) - set(game_ids):
+            del self.games[game_id]
+
+    def due(self, limit=None):
+        now = time.monotonic()
+        due = sorted((entry[0], game_id) for game_id, entry in self.games.items() if entry[0] <= now)
+        if limit is not None:
+            due = due[:limit]
+        return [game_id for _, game_id in due]
+
+    def record(self, game_id, stream_count, new_count):
+        entry = self.games.get(game_id)
+        if entry is None:
+            return
+
+        if new_count:
+            interval = self.min_interval
+        else:
+            ceiling = self.active_interval if stream_count else self.quiet_interval
+            interval = min(entry[1] * self.backoff, ceiling)
+        entry[0] = time.monotonic() + interval
+        entry[1] = interval
@@ -0,0 +1,67 @@
+import asyncio
+import queue
+
+def shard_for_guild(guild_id, shard_count):
+    # Discord's own routing formula for which shard receives a guild's events
+    return (guild_id >> 22) % shard_count
+
+def split_shards(shard_count, workers):
+    # Contiguous shard ranges, as even as possible, one per worker process
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+class PollBus:
+    # Worker 0 polls Twitch for every worker. The others send it the game IDs their guilds
+    # follow and get back the stream lists, so no game is polled twice across processes.
+    def __init__(self, worker_index, inboxes):
+        self.worker_index = worker_index
+        self.inboxes = inboxes
+        self.is_poller = worker_index == 0
+        self.remote_games = {}
+        self.last_published = None
+
+    def publish_games(self, game_ids):
+        game_ids = sorted(game_ids)
+        if game_ids != self.last_published:
+            self.last_published = game_ids
+            self.inboxes[0].put(("games", self.worker_index, game_ids))
+
+    def wanted_games(self):
+        wanted = set()
+        for game_ids in self.remote_games.values():
+            wanted.update(game_ids)
+        return wanted
+
+    def publish_streams(self, streams_by_game, polled=()):
+        # polled: games whose stream lists are complete, so a missing stream has really ended
+        for index, inbox in enumerate(self.inboxes):
+            if index != self.worker_index:
+                inbox.put(("streams", self.worker_index, (streams_by_game, list(polled))))
+
+    def receive(self, inbox):
+        # Short timeout so the executor thread never blocks shutdown for long
+        try:
+            return inbox.get(timeout=1.0)
+        except queue.Empty:
+            return None
+
+    async def listen(self, on_streams):
+        loop = asyncio.get_running_loop()
+        inbox = self.inboxes[self.worker_index]
+        while True:
+            message = await loop.run_in_executor(None, self.receive, inbox)
+            if message is None:
+                continue
+            kind, sender, data = message
+            if kind == "games":
+                self.remote_games[sender] = data
+            elif kind == "streams":
+                streams_by_game, polled = data
+                await on_streams(streams_by_game, set(polled))
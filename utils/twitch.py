@@ -0,0 +1,184 @@
+import asyncio
+import time
+import aiohttp
+from utils import metrics
+
+HELIX_URL = "https://api.twitch.tv/helix"
+TOKEN_URL = "https://id.twitch.tv/oauth2/token"
+
+class HelixClient:
+    def __init__(self, client_id, token=None, max_concurrency=8, timeout=10, base_url=None, token_url=None):
+        self.client_id = client_id
+        self.token = token
+        self.base_url = base_url or HELIX_URL
+        self.token_url = token_url or TOKEN_URL
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = None
+        # Set by TokenManager so a 401 can refresh the token and replay the request
+        self.auth = None
+
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = 0
+        self.rate_limit_reserve = 5
+
+    def get_session(self):
+        # Created lazily so it is bound to the running event loop.
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def headers(self):
+        return {
+            "Client-ID": self.client_id,
+            "Authorization": "Bearer " + (self.token or "")
+        }
+
+    def update_rate_limit(self, headers):
+        remaining = headers.get("Ratelimit-Remaining")
+        reset = headers.get("Ratelimit-Reset")
+        if remaining is not None:
+            self.rate_limit_remaining = int(remaining)
+            metrics.set_gauge("helix_ratelimit_remaining", self.rate_limit_remaining)
+        if reset is not None:
+            self.rate_limit_reset = int(reset)
+
+    def rate_limit_delay(self):
+        if self.rate_limit_remaining is not None and self.rate_limit_remaining <= self.rate_limit_reserve:
+            return max(0.0, self.rate_limit_reset - time.time())
+        return 0.0
+
+    def rate_limit_budget(self):
+        # Requests we can still spend in the current bucket window, None if unknown
+        if self.rate_limit_remaining is None or time.time() >= self.rate_limit_reset:
+            return None
+        return max(0, self.rate_limit_remaining - self.rate_limit_reserve)
+
+    async def request(self, method, url, params=None, headers=None, json=None, retry_on_429=True, retry_on_401=True):
+        delay = self.rate_limit_delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        endpoint = url.rsplit("/", 1)[-1]
+        async with self.semaphore:
+            try:
+                with metrics.timer("helix_request_seconds", endpoint=endpoint):
+                    async with self.get_session().request(method, url, params=params, headers=headers, json=json) as response:
+                        self.update_rate_limit(response.headers)
+                        metrics.inc("helix_requests_total", endpoint=endpoint, status=response.status)
+                        if response.status in (200, 202):
+                            return response.status, await response.json()
+                        status, text = response.status, await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.inc("helix_requests_total", endpoint=endpoint, status="error")
+                return None, str(e)
+
+        if status == 429 and retry_on_429:
+            self.rate_limit_remaining = 0
+            return await self.request(method, url, params, headers, json, retry_on_429=False, retry_on_401=retry_on_401)
+        if status == 401 and retry_on_401 and self.auth and headers and "Authorization" in headers:
+            sent_token = headers["Authorization"].removeprefix("Bearer ")
+            await self.auth.refresh(stale_token=sent_token)
+            headers = {**headers, "Authorization": "Bearer " + (self.token or "")}
+            return await self.request(method, url, params, headers, json, retry_on_429=retry_on_429, retry_on_401=False)
+        return status, text
+
+    async def get(self, endpoint, params):
+        return await self.request("GET", f"{self.base_url}/{endpoint}", params=params, headers=self.headers())
+
+    async def post(self, url, json):
+        return await self.request("POST", url, headers=self.headers(), json=json)
+
+    async def post_token(self, params):
+        return await self.request("POST", self.token_url, params=params)
+
+class TokenManager:
+    # Keeps helix.token valid. With a refresh token it renews the user token; without
+    # one it requests an app access token (client-credentials grant). Concurrent callers
+    # share a single in-flight refresh, and failures back off for retry_delay seconds.
+    def __init__(self, helix, client_id, client_secret, refresh_token=None, refresh_margin=300, retry_delay=30):
+        self.helix = helix
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        helix.auth = self
+        self.problem = self.credentials_problem()
+        if self.problem:
+            print(f"Twitch token refresh disabled: {self.problem}")
+
+        # Monotonic deadlines; an unknown expiry refreshes on first use
+        self.expires_at = 0.0
+        self.retry_at = 0.0
+        self.inflight = None
+
+    @property
+    def grant_type(self):
+        return "refresh_token" if self.refresh_token else "client_credentials"
+
+    def credentials_problem(self):
+        if not self.client_id:
+            return "TWITCH_CLIENT_ID is not set"
+        if not self.refresh_token and not self.client_secret:
+            return "an app access token needs TWITCH_CLIENT_SECRET (or set TWITCH_REFRESH_TOKEN)"
+        return None
+
+    def fresh(self):
+        return bool(self.helix.token) and time.monotonic() < self.expires_at - self.refresh_margin
+
+    async def ensure(self):
+        if self.fresh() or time.monotonic() < self.retry_at:
+            return self.helix.token
+        return await self.refresh()
+
+    async def refresh(self, stale_token=None):
+        # A 401 on a token someone already replaced just needs a replay, not another refresh
+        if stale_token is not None and stale_token != self.helix.token:
+            return self.helix.token
+        if stale_token is not None and time.monotonic() < self.retry_at:
+            return self.helix.token
+        if self.problem:
+            return self.helix.token
+
+        if self.inflight is None or self.inflight.done():
+            self.inflight = asyncio.create_task(self.fetch())
+        # Shielded so one cancelled caller doesn't cancel the refresh for everyone else
+        return await asyncio.shield(self.inflight)
+
+    async def fetch(self):
+        params = {
+            "grant_type": self.grant_type,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": self.refresh_token
+        }
+        # A public client has no secret; None can't go in a query string
+        params = {name: value for name, value in params.items() if value is not None}
+
+        try:
+            status, data = await self.helix.post_token(params)
+            if status == 200 and not data.get("access_token"):
+                status, data = None, f"no access_token in {data}"
+        except Exception as e:
+            # Anything unexpected must not escape into the polling loop that awaited us
+            status, data = None, repr(e)
+        metrics.inc("twitch_token_refreshes_total", grant=self.grant_type, status=status if status else "error")
+        if status != 200:
+            self.retry_at = time.monotonic() + self.retry_delay
+            print(f"Error refreshing token: {status} - {data}")
+            return self.helix.token
+
+        self.helix.token = data["access_token"]
+        # Twitch may rotate the refresh token on use
+        if data.get("refresh_token"):
+            self.refresh_token = data["refresh_token"]
+        self.expires_at = time.monotonic() + data.get("expires_in", 3600)
+        self.retry_at = 0.0
+        return self.helix.token